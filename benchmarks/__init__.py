@@ -0,0 +1 @@
+"""Benchmarks for the student database paths (python -m benchmarks.bench)"""
@@ -0,0 +1,188 @@
+"""Time and memory benchmarks for the student database paths
+
+    python -m benchmarks.bench --sizes 10000 100000 --output results.json
+    python -m benchmarks.bench --sizes 10000 --compare results.json
+
+Each size gets a fresh seeded database in a temporary directory. Every
+operation mirrors a GUI action through StudentRepository and is measured
+for wall time and peak Python allocation. Results are written as JSON so
+runs can be compared with --compare.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from student_management import StudentRepository
+
+from .datagen import generate_database, write_students_csv
+
+PAGE = 30
+SEARCH_TERMS = ['smith', 'ja', 'priya kumar', 'example.edu', '+1555']
+
+def measure(name, size, func, repeat=1):
+    """Return the best wall time of func over repeat runs and its peak memory
+
+    Timing runs are not traced; one extra run under tracemalloc gives the
+    peak Python allocation, so tracing overhead does not skew the times.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = {'operation': name, 'rows': size, 'seconds': round(best, 6),
+              'peak_kib': peak // 1024}
+    print(f"{name:<28} {size:>9}  {best * 1000:10.2f} ms  {peak // 1024:8} KiB", flush=True)
+    return result
+
+def list_benchmarks(repo, size):
+    """refresh_student_list, scrolling and a scrollbar jump"""
+    def first_window():
+        repo.count_students()
+        repo.fetch_student_page(PAGE)
+
+    def scroll_pages():
+        rows = repo.fetch_student_page(PAGE)
+        # Small rosters run out of pages before 100
+        for _ in range(100):
+            if not rows:
+                break
+            rows = repo.fetch_student_page(PAGE, after=repo.list_key(rows[-1]))
+
+    def jump_middle():
+        repo.fetch_student_page(PAGE, offset=size // 2)
+
+    return [
+        measure('list.first_window', size, first_window, repeat=5),
+        measure('list.scroll_100_pages', size, scroll_pages, repeat=3),
+        measure('list.jump_middle', size, jump_middle, repeat=5),
+    ]
+
+def search_benchmarks(repo, size):
+    """on_search (count + first page) and ranked search"""
+    def search_window():
+        for term in SEARCH_TERMS:
+            filter_sql, params = repo.build_search_filter(term)
+            repo.count_students(filter_sql, params)
+            repo.fetch_student_page(PAGE, filter_sql, params)
+
+    def search_ranked():
+        for term in SEARCH_TERMS:
+            repo.search_students(term)
+
+    return [
+        measure('search.window', size, search_window, repeat=3),
+        measure('search.ranked', size, search_ranked, repeat=3),
+    ]
+
+def transfer_benchmarks(repo, size, workdir):
+    """export_csv in each format and import_csv into an empty database"""
+    results = []
+    for extension in ('csv', 'jsonl.gz'):
+        filename = os.path.join(workdir, f"export.{extension}")
+        results.append(measure(f'export.{extension}', size,
+                               lambda: repo.export_students(filename)))
+
+    source = os.path.join(workdir, 'import.csv')
+    write_students_csv(source, size, seed=size)
+    target_path = os.path.join(workdir, 'import.db')
+
+    def import_fresh():
+        for suffix in ('', '-journal', '-wal', '-shm'):
+            if os.path.exists(target_path + suffix):
+                os.remove(target_path + suffix)
+        target = StudentRepository(target_path)
+        target.import_students(source)
+        target.close()
+
+    results.append(measure('import.csv', size, import_fresh))
+    return results
+
+def report_benchmarks(repo, size, workdir):
+    """generate_report with a cold and a warm summary cache"""
+    filename = os.path.join(workdir, 'report.txt')
+    return [
+        measure('report.cold', size, lambda: repo.write_report(filename, use_cache=False)),
+        measure('report.warm_summary', size,
+                lambda: repo.write_report(filename, details=False), repeat=3),
+    ]
+
+def run(sizes, seed):
+    """Run every benchmark for each roster size"""
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            db_path = os.path.join(workdir, 'bench.db')
+            start = time.perf_counter()
+            generate_database(db_path, size, seed=seed)
+            print(f"-- generated {size} students in {time.perf_counter() - start:.1f} s", flush=True)
+
+            repo = StudentRepository(db_path)
+            results += list_benchmarks(repo, size)
+            results += search_benchmarks(repo, size)
+            results += transfer_benchmarks(repo, size, workdir)
+            results += report_benchmarks(repo, size, workdir)
+            repo.close()
+    return results
+
+def compare(results, baseline_file):
+    """Print the time ratio of each result against a previous run"""
+    with open(baseline_file, encoding='utf-8') as f:
+        baseline = {(r['operation'], r['rows']): r for r in json.load(f)['results']}
+
+    print("\noperation                         rows    before ms     now ms   ratio")
+    for r in results:
+        old = baseline.get((r['operation'], r['rows']))
+        if old is None:
+            continue
+        ratio = r['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        flag = "  <-- slower" if ratio > 1.25 else ""
+        print(f"{r['operation']:<28} {r['rows']:>9}  {old['seconds'] * 1000:10.2f} "
+              f"{r['seconds'] * 1000:10.2f}  {ratio:6.2f}{flag}")
+
+def main(argv=None):
+    """Run the benchmarks from the command line"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                        help="student counts to benchmark (e.g. 10000 100000 1000000)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.seed)
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'meta': {
+                    'timestamp': datetime.now().isoformat(timespec='seconds'),
+                    'python': platform.python_version(),
+                    'sqlite': sqlite3.sqlite_version,
+                    'platform': platform.platform(),
+                    'seed': args.seed,
+                },
+                'results': results,
+            }, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Seeded synthetic students, courses and enrollments
+
+The same seed and size always produce the same data, so benchmark runs are
+comparable from one run to the next.
+"""
+
+import csv
+import os
+import random
+from datetime import date, timedelta
+
+from student_management import StudentRepository
+
+FIRST_NAMES = ['James', 'Mary', 'Aayaam', 'Harshit', 'Nishant', 'Priya', 'Wei', 'Fatima',
+               'Carlos', 'Olga', 'Kenji', 'Amara', 'Liam', 'Sofia', 'Noah', 'Zara',
+               'Mateo', 'Ananya', 'Ethan', 'Chloe', 'Omar', 'Ingrid', 'Ravi', 'Lucia']
+LAST_NAMES = ['Smith', 'Jain', 'Pratap', 'Ranjan', 'Garcia', 'Chen', 'Kumar', 'Okafor',
+              'Müller', 'Rossi', 'Nguyen', 'Silva', 'Kowalski', 'Tanaka', 'Haddad', 'Brown',
+              'Ivanova', 'Singh', 'Moreau', 'Jensen', 'Lopez', 'Park', 'Ali', 'Walker']
+STATUSES = ['Active'] * 7 + ['Inactive'] + ['Graduated'] * 2
+GRADES = ['A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'D', 'F', None]
+
+def student_rows(count, seed=0):
+    """Yield (first, last, email, phone, dob, enrollment_date, address, status) tuples"""
+    rng = random.Random(seed)
+    birth_start = date(1995, 1, 1)
+    enroll_start = date(2015, 1, 1)
+    for i in range(count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        yield (
+            first,
+            last,
+            f"{first.lower()}.{last.lower()}.{i}@example.edu",
+            f"+1{rng.randrange(10**9, 10**10)}",
+            (birth_start + timedelta(days=rng.randrange(3650))).isoformat(),
+            (enroll_start + timedelta(days=rng.randrange(3650))).isoformat(),
+            f"{rng.randrange(1, 9999)} {rng.choice(LAST_NAMES)} Street",
+            rng.choice(STATUSES),
+        )
+
+def write_students_csv(filename, count, seed=0):
+    """Write synthetic students in the import/export CSV layout"""
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['First Name', 'Last Name', 'Email', 'Phone',
+                         'Date of Birth', 'Address', 'Status'])
+        for first, last, email, phone, dob, _, address, status in student_rows(count, seed):
+            writer.writerow([first, last, email, phone, dob, address, status])
+
+def generate_database(db_path, students, enrollments_per_student=3, seed=0):
+    """Create a database with synthetic students, courses and enrollments
+
+    Courses scale with the roster (one per 200 students, at least 20) and
+    each student gets up to enrollments_per_student distinct courses.
+    """
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} already exists")
+
+    rng = random.Random(seed + 1)
+    course_count = max(20, students // 200)
+
+    def fill(conn):
+        with conn:
+            conn.executemany("""
+                INSERT INTO students (first_name, last_name, email, phone, date_of_birth,
+                                      enrollment_date, address, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, student_rows(students, seed))
+
+            conn.executemany("""
+                INSERT INTO courses (course_code, course_name, credits, instructor)
+                VALUES (?, ?, ?, ?)
+            """, ((f"C{i:05d}", f"Course {i}", rng.choice([2, 3, 3, 4]),
+                   f"Prof. {rng.choice(LAST_NAMES)}") for i in range(course_count)))
+
+            def enrollments():
+                for student_id in range(1, students + 1):
+                    for course_id in rng.sample(range(1, course_count + 1),
+                                                rng.randint(0, enrollments_per_student)):
+                        grade = rng.choice(GRADES)
+                        yield (student_id, course_id, grade, 'Completed' if grade else 'Enrolled')
+
+            conn.executemany("""
+                INSERT INTO enrollments (student_id, course_id, grade, status)
+                VALUES (?, ?, ?, ?)
+            """, enrollments())
+
+    repo = StudentRepository(db_path)
+    repo.writer.run(fill)
+    repo.close()
@@ -1,77 +1,231 @@
 
 
 
+import time
+
+# Taken before the other imports so --startup-timing can report what they cost
+STARTED = time.perf_counter()
+
+import argparse
+import csv
+import sys
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import sqlite3
-from datetime import datetime
-import csv
-import json
-import os
+import queue
+import threading
+from itertools import islice
+
+from student_management import (DEFAULT_DB_PATH, LIST_COLUMNS, STUDENT_STATUSES, Instrumentation,
+                                StudentRepository)
+from student_management.snapshot import SNAPSHOT_COLUMNS
+from student_management.validation import check_student
+
+LIST_VISIBLE_ROWS = 20
+LIST_OVERSCAN = 10
+SEARCH_DEBOUNCE_MS = 250
+LIST_FIELDS = dict(zip(LIST_COLUMNS, SNAPSHOT_COLUMNS))
+SEARCH_POLL_MS = 30
+TASK_POLL_MS = 100
+WRITE_POLL_MS = 20
+COUNT_POLL_MS = 20
+IMPORT_DUPLICATES_SHOWN = 5
+ARCHIVE_SEARCH_LIMIT = 200
+
+class ProgressDialog:
+    """Progress window with a cancel button for background tasks"""
+
+    def __init__(self, parent, title):
+        self.cancelled = threading.Event()
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(title)
+        self.window.transient(parent)
+        self.window.resizable(False, False)
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        frame = ttk.Frame(self.window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        self.message_var = tk.StringVar(value="Starting...")
+        ttk.Label(frame, textvariable=self.message_var, width=50).pack(anchor=tk.W)
+        self.progress = ttk.Progressbar(frame, length=350, maximum=1.0)
+        self.progress.pack(pady=10)
+        ttk.Button(frame, text="Cancel", command=self.cancel).pack()
+
+        self.window.grab_set()
+
+    def cancel(self):
+        """Ask the running task to stop"""
+        self.cancelled.set()
+        self.message_var.set("Cancelling...")
+
+    def update(self, fraction, message):
+        """Show task progress"""
+        if not self.cancelled.is_set():
+            self.progress['value'] = fraction
+            self.message_var.set(message)
+
+    def close(self):
+        """Close the progress window"""
+        self.window.grab_release()
+        self.window.destroy()
+
+class DiagnosticsDialog:
+    """Window showing statement and UI operation timings"""
+
+    def __init__(self, parent, instrumentation, statements=True):
+        self.instrumentation = instrumentation
+        self.statements = statements
+        self.plans = {}
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("Diagnostics")
+        self.window.geometry("900x600")
+        self.window.transient(parent)
+
+        frame = ttk.Frame(self.window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        frame.columnconfigure(0, weight=1)
+        frame.rowconfigure(0, weight=1)
+
+        columns = ('Calls', 'Rows', 'Avg ms', 'Max ms', 'Total ms', 'Fetch ms')
+        self.tree = ttk.Treeview(frame, columns=columns, show='tree headings', height=15)
+        self.tree.heading('#0', text='Statement / Operation')
+        self.tree.column('#0', width=450)
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=80, anchor=tk.E)
+        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=self.tree.yview)
+        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.bind('<<TreeviewSelect>>', self.on_select)
+
+        self.detail = tk.Text(frame, height=10, wrap=tk.WORD)
+        self.detail.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
+
+        button_frame = ttk.Frame(frame)
+        button_frame.grid(row=2, column=0, columnspan=2, pady=(10, 0))
+        ttk.Button(button_frame, text="Refresh", command=self.refresh).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Reset", command=self.reset).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Export JSON", command=self.export_json).pack(side=tk.LEFT, padx=5)
+
+        self.refresh()
+
+    def refresh(self):
+        """Reload the timings from the recorder"""
+        snapshot = self.instrumentation.snapshot()
+        self.tree.delete(*self.tree.get_children())
+        self.plans = {}
+
+        operations = self.tree.insert("", tk.END, text="UI operations", open=True)
+        for op in snapshot['operations']:
+            self.tree.insert(operations, tk.END, text=op['name'], values=(
+                op['calls'], "", op['avg_ms'], op['max_ms'], op['total_ms'], ""))
+
+        statements = self.tree.insert("", tk.END, text="SQL statements", open=True)
+        if not self.statements:
+            self.tree.insert(statements, tk.END, text="Start the app with --profile to record statements")
+        for st in snapshot['statements']:
+            item = self.tree.insert(statements, tk.END, text=st['sql'][:120], values=(
+                st['calls'], st['rows'], st['avg_ms'], st['max_ms'], st['total_ms'], st['fetch_ms']))
+            self.plans[item] = st
+
+        self.detail.delete('1.0', tk.END)
+        self.detail.insert(tk.END, f"{len(snapshot['slow_log'])} statements slower than "
+                                   f"{snapshot['slow_threshold_ms']} ms since {snapshot['started']}")
+
+    def on_select(self, event):
+        """Show the full text, histogram and query plan of a statement"""
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self.plans:
+            return
+        st = self.plans[selection[0]]
+        text = st['sql'] + "\n\n" + "  ".join(f"{k}: {v}" for k, v in st['histogram'].items())
+        if st['plan']:
+            text += "\n\nQuery plan:\n" + "\n".join(st['plan'])
+        self.detail.delete('1.0', tk.END)
+        self.detail.insert(tk.END, text)
+
+    def reset(self):
+        """Discard the recorded timings"""
+        self.instrumentation.reset()
+        self.refresh()
+
+    def export_json(self):
+        """Save the recorded timings as JSON"""
+        filename = filedialog.asksaveasfilename(
+            parent=self.window, defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+        )
+        if not filename:
+            return
+        try:
+            self.instrumentation.export_json(filename)
+            messagebox.showinfo("Success", f"Diagnostics exported to {filename}", parent=self.window)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to export diagnostics: {str(e)}", parent=self.window)
+
+def record_startup(instrumentation, phase, started, verbose=False):
+    """Record the time since started as startup phase, printing it if verbose"""
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    instrumentation.record_operation(f'startup.{phase}', elapsed_ms)
+    if verbose:
+        print(f"startup {phase:<12}{elapsed_ms:9.1f} ms", file=sys.stderr)
 
 class StudentManagementSystem:
-    def __init__(self, root):
+    def __init__(self, root, instrumentation=None, startup_timing=False, db_path=DEFAULT_DB_PATH,
+                 profile=False):
         self.root = root
+        self.db_path = db_path
+        self.instrumentation = instrumentation or Instrumentation()
+        # Timing every statement and fetched row has a cost, so it is opt-in
+        self.query_instrumentation = self.instrumentation if profile else None
+        self.startup_timing = startup_timing
         self.root.title("Student Management System")
         self.root.geometry("1200x800")
         self.root.configure(bg="#f0f0f0")
 
-        
+        started = time.perf_counter()
         self.init_database()
+        record_startup(self.instrumentation, 'database', started, startup_timing)
 
         
-        self.create_widgets()
+        self.list_filter_sql = ""
+        self.list_filter_params = ()
+        self.list_total = 0
+        self.list_offset = 0
+        self.window_start = 0
+        self.window_rows = []
+        self.displayed_rows = {}
+        self.list_generation = 0
+        self.list_sort = []
+        self.list_view = None
+        self.archive_rows = None
+        self.archived_ids = set()
+        self.list_counting = None
+        self.scroll_job = None
 
         
-        self.refresh_student_list()
-
-    def init_database(self):
-        """Initialize SQLite database and create tables"""
-        self.conn = sqlite3.connect('student_management.db')
-        self.cursor = self.conn.cursor()
-
-        
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS students (
-                student_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                first_name TEXT NOT NULL,
-                last_name TEXT NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                phone TEXT,
-                date_of_birth DATE,
-                enrollment_date DATE DEFAULT CURRENT_DATE,
-                address TEXT,
-                status TEXT DEFAULT 'Active'
-            )
-        """)
+        self.search_generation = 0
+        self.search_job = None
+        self.search_poll_job = None
+        self.search_requests = queue.Queue()
+        self.search_results = queue.Queue()
+        threading.Thread(target=self.search_worker, daemon=True).start()
+
+        started = time.perf_counter()
+        self.create_widgets()
+        record_startup(self.instrumentation, 'widgets', started, startup_timing)
 
-        
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS courses (
-                course_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                course_code TEXT UNIQUE NOT NULL,
-                course_name TEXT NOT NULL,
-                credits INTEGER DEFAULT 3,
-                instructor TEXT,
-                description TEXT
-            )
-        """)
+        started = time.perf_counter()
+        self.load_first_page()
+        record_startup(self.instrumentation, 'first_page', started, startup_timing)
 
-        
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS enrollments (
-                enrollment_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER,
-                course_id INTEGER,
-                enrollment_date DATE DEFAULT CURRENT_DATE,
-                grade TEXT,
-                status TEXT DEFAULT 'Enrolled',
-                FOREIGN KEY (student_id) REFERENCES students (student_id),
-                FOREIGN KEY (course_id) REFERENCES courses (course_id)
-            )
-        """)
-
-        self.conn.commit()
+    def init_database(self):
+        """Open the student repository"""
+        self.repo = StudentRepository(self.db_path, instrumentation=self.query_instrumentation)
 
     def create_widgets(self):
         """Create the main GUI widgets"""
@@ -135,7 +289,7 @@ class StudentManagementSystem:
         ttk.Label(left_frame, text="Status:").grid(row=6, column=0, sticky=tk.W, pady=5)
         self.status_var = tk.StringVar(value="Active")
         status_combo = ttk.Combobox(left_frame, textvariable=self.status_var, 
-                                   values=["Active", "Inactive", "Graduated"])
+                                   values=list(STUDENT_STATUSES))
         status_combo.grid(row=6, column=1, pady=5)
 
     
@@ -150,6 +304,18 @@ class StudentManagementSystem:
 
         ttk.Button(search_frame, text="Clear", command=self.clear_search).grid(row=0, column=2)
 
+        ttk.Label(search_frame, text="Status:").grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        self.status_filter_var = tk.StringVar(value="All")
+        status_filter = ttk.Combobox(search_frame, textvariable=self.status_filter_var, width=17,
+                                     values=["All"] + list(STUDENT_STATUSES), state="readonly")
+        status_filter.grid(row=1, column=1, padx=5, pady=(5, 0))
+        status_filter.bind('<<ComboboxSelected>>', self.on_status_filter)
+
+        self.include_archived_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(search_frame, text="Include archived", variable=self.include_archived_var,
+                        command=self.on_include_archived).grid(row=2, column=1, sticky=tk.W,
+                                                               padx=5, pady=(5, 0))
+
     def create_right_panel(self, parent):
         """Create right panel with student list"""
         right_frame = ttk.LabelFrame(parent, text="Student List", padding="10")
@@ -158,12 +324,12 @@ class StudentManagementSystem:
         right_frame.rowconfigure(0, weight=1)
 
         
-        columns = ('ID', 'First Name', 'Last Name', 'Email', 'Phone', 'Status')
-        self.tree = ttk.Treeview(right_frame, columns=columns, show='headings', height=20)
+        columns = LIST_COLUMNS
+        self.tree = ttk.Treeview(right_frame, columns=columns, show='headings', height=LIST_VISIBLE_ROWS)
 
         
         for col in columns:
-            self.tree.heading(col, text=col)
+            self.tree.heading(col, text=col, command=lambda c=col: self.sort_list(c))
             if col == 'ID':
                 self.tree.column(col, width=50)
             elif col in ['First Name', 'Last Name']:
@@ -174,17 +340,27 @@ class StudentManagementSystem:
                 self.tree.column(col, width=100)
 
         
-        v_scrollbar = ttk.Scrollbar(right_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.v_scrollbar = ttk.Scrollbar(right_frame, orient=tk.VERTICAL, command=self.on_list_scroll)
         h_scrollbar = ttk.Scrollbar(right_frame, orient=tk.HORIZONTAL, command=self.tree.xview)
-        self.tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.tree.configure(xscrollcommand=h_scrollbar.set)
 
         
         self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        v_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.v_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
         h_scrollbar.grid(row=1, column=0, sticky=(tk.W, tk.E))
 
         
         self.tree.bind('<<TreeviewSelect>>', self.on_student_select)
+        self.tree.bind('<MouseWheel>', self.on_list_wheel)
+        self.tree.bind('<Button-4>', self.on_list_wheel)
+        self.tree.bind('<Button-5>', self.on_list_wheel)
+        self.tree.bind('<Up>', self.on_list_key)
+        self.tree.bind('<Down>', self.on_list_key)
+        self.tree.bind('<Prior>', self.on_list_key)
+        self.tree.bind('<Next>', self.on_list_key)
+        self.tree.bind('<Home>', self.on_list_key)
+        self.tree.bind('<End>', self.on_list_key)
+        self.tree.bind('<Shift-Button-1>', self.on_heading_shift_click)
 
     def create_bottom_panel(self, parent):
         """Create bottom panel with action buttons"""
@@ -196,6 +372,8 @@ class StudentManagementSystem:
                   style="Accent.TButton").pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Update Student", command=self.update_student).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Delete Student", command=self.delete_student).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Archive Student", command=self.archive_student).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Restore Student", command=self.restore_student).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Clear Form", command=self.clear_form).pack(side=tk.LEFT, padx=5)
 
         
@@ -205,6 +383,8 @@ class StudentManagementSystem:
         ttk.Button(button_frame, text="Export CSV", command=self.export_csv).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Import CSV", command=self.import_csv).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Generate Report", command=self.generate_report).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Archive Inactive", command=self.archive_students).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Diagnostics", command=self.show_diagnostics).pack(side=tk.LEFT, padx=5)
 
         
         self.selected_student_id = None
@@ -214,29 +394,15 @@ class StudentManagementSystem:
         if not self.validate_form():
             return
 
-        try:
-            self.cursor.execute("""
-                INSERT INTO students (first_name, last_name, email, phone, date_of_birth, address, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                self.first_name_var.get().strip(),
-                self.last_name_var.get().strip(),
-                self.email_var.get().strip(),
-                self.phone_var.get().strip(),
-                self.dob_var.get().strip() or None,
-                self.address_text.get("1.0", tk.END).strip(),
-                self.status_var.get()
-            ))
-
-            self.conn.commit()
+        values = self.form_values()
+        generation = self.list_generation
+
+        def on_done(student_id):
             messagebox.showinfo("Success", "Student added successfully!")
             self.clear_form()
-            self.refresh_student_list()
+            self.apply_list_change(None, self.get_list_row(student_id), generation)
 
-        except sqlite3.IntegrityError:
-            messagebox.showerror("Error", "Email already exists!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to add student: {str(e)}")
+        self.run_write(lambda: self.repo.add_student(*values), on_done, "Failed to add student")
 
     def update_student(self):
         """Update selected student"""
@@ -244,34 +410,24 @@ class StudentManagementSystem:
             messagebox.showwarning("Warning", "Please select a student to update")
             return
 
+        if self.selected_archived():
+            return
+
         if not self.validate_form():
             return
 
-        try:
-            self.cursor.execute("""
-                UPDATE students 
-                SET first_name=?, last_name=?, email=?, phone=?, date_of_birth=?, address=?, status=?
-                WHERE student_id=?
-            """, (
-                self.first_name_var.get().strip(),
-                self.last_name_var.get().strip(),
-                self.email_var.get().strip(),
-                self.phone_var.get().strip(),
-                self.dob_var.get().strip() or None,
-                self.address_text.get("1.0", tk.END).strip(),
-                self.status_var.get(),
-                self.selected_student_id
-            ))
-
-            self.conn.commit()
+        student_id = self.selected_student_id
+        values = self.form_values()
+        old_row = self.get_list_row(student_id)
+        generation = self.list_generation
+
+        def on_done(_):
             messagebox.showinfo("Success", "Student updated successfully!")
             self.clear_form()
-            self.refresh_student_list()
+            self.apply_list_change(old_row, self.get_list_row(student_id), generation)
 
-        except sqlite3.IntegrityError:
-            messagebox.showerror("Error", "Email already exists!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to update student: {str(e)}")
+        self.run_write(lambda: self.repo.update_student(student_id, *values), on_done,
+                       "Failed to update student")
 
     def delete_student(self):
         """Delete selected student"""
@@ -279,46 +435,134 @@ class StudentManagementSystem:
             messagebox.showwarning("Warning", "Please select a student to delete")
             return
 
+        if self.selected_archived():
+            return
+
         result = messagebox.askyesno("Confirm Delete", 
                                    "Are you sure you want to delete this student? This action cannot be undone.")
         if result:
-            try:
-                self.cursor.execute("DELETE FROM students WHERE student_id=?", (self.selected_student_id,))
-                self.conn.commit()
+            student_id = self.selected_student_id
+            old_row = self.get_list_row(student_id)
+            generation = self.list_generation
+
+            def on_done(_):
                 messagebox.showinfo("Success", "Student deleted successfully!")
                 self.clear_form()
-                self.refresh_student_list()
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to delete student: {str(e)}")
+                self.apply_list_change(old_row, None, generation)
 
-    def validate_form(self):
-        """Validate form inputs"""
-        if not self.first_name_var.get().strip():
-            messagebox.showerror("Error", "First name is required")
-            return False
+            self.run_write(lambda: self.repo.delete_student(student_id), on_done,
+                           "Failed to delete student")
 
-        if not self.last_name_var.get().strip():
-            messagebox.showerror("Error", "Last name is required")
-            return False
+    def archive_student(self):
+        """Move the selected student and their enrollments to the archive"""
+        if not self.selected_student_id:
+            messagebox.showwarning("Warning", "Please select a student to archive")
+            return
 
-        if not self.email_var.get().strip():
-            messagebox.showerror("Error", "Email is required")
-            return False
+        if self.selected_archived():
+            return
 
-        
-        email = self.email_var.get().strip()
-        if "@" not in email or "." not in email:
-            messagebox.showerror("Error", "Please enter a valid email address")
+        result = messagebox.askyesno("Confirm Archive",
+                                   "Move this student and their enrollments to the archive?\n\n"
+                                   "Archived students show up in searches with Include archived "
+                                   "checked, and Restore Student brings them back.")
+        if result:
+            student_id = self.selected_student_id
+            old_row = self.get_list_row(student_id)
+            generation = self.list_generation
+
+            def on_done(_):
+                messagebox.showinfo("Success", "Student archived successfully!")
+                self.clear_form()
+                self.apply_list_change(old_row, None, generation)
+
+            self.run_write(lambda: self.repo.archive_student(student_id), on_done,
+                           "Failed to archive student")
+
+    def restore_student(self):
+        """Move the selected archived student and their enrollments back"""
+        student_id = self.selected_student_id
+        if student_id not in self.archived_ids:
+            messagebox.showwarning("Warning", "Please select an archived student to restore")
+            return
+
+        def on_done(_):
+            messagebox.showinfo("Success", "Student restored successfully!")
+            self.clear_form()
+            self.refresh_student_list()
+
+        self.run_write(lambda: self.repo.restore_students([student_id]), on_done,
+                       "Failed to restore student")
+
+    def selected_archived(self):
+        """Warn and return True if the selected student is in the archive"""
+        if self.selected_student_id not in self.archived_ids:
             return False
+        messagebox.showwarning("Warning", "This student is archived, restore them first")
+        return True
 
-    
-        dob = self.dob_var.get().strip()
-        if dob:
+    def archive_students(self):
+        """Move every Graduated and Inactive student to the archive"""
+        if not messagebox.askyesno("Confirm Archive",
+                                   "Move every Graduated and Inactive student and their "
+                                   "enrollments to the archive?"):
+            return
+
+        def work(report, cancelled):
+            return self.repo.archive_students(report=report, cancelled=cancelled)
+
+        def on_done(archived):
+            if archived is None:
+                messagebox.showinfo("Archive Cancelled", "Archive cancelled, no students were moved")
+                return
+            self.refresh_student_list()
+            messagebox.showinfo("Success", f"Archived {archived} students")
+
+        self.run_task("Archiving Students", work, on_done, "Failed to archive students")
+
+    def run_write(self, work, on_done, error_message):
+        """Queue work() on the repository writer and call on_done(result) when it commits
+
+        The Tk thread never waits for the writer, so the window stays
+        responsive while a write is queued behind an import.
+        """
+        future = self.repo.writer.submit(lambda conn: work())
+
+        def poll():
+            if not future.done():
+                self.root.after(WRITE_POLL_MS, poll)
+                return
             try:
-                datetime.strptime(dob, '%Y-%m-%d')
-            except ValueError:
-                messagebox.showerror("Error", "Please enter date in YYYY-MM-DD format")
-                return False
+                result = future.result()
+            except sqlite3.IntegrityError:
+                messagebox.showerror("Error", "Email already exists!")
+            except Exception as e:
+                messagebox.showerror("Error", f"{error_message}: {str(e)}")
+            else:
+                on_done(result)
+
+        poll()
+
+    def form_values(self):
+        """Return the form fields in repository order"""
+        return (
+            self.first_name_var.get().strip(),
+            self.last_name_var.get().strip(),
+            self.email_var.get().strip(),
+            self.phone_var.get().strip(),
+            self.dob_var.get().strip() or None,
+            self.address_text.get("1.0", tk.END).strip(),
+            self.status_var.get()
+        )
+
+    def validate_form(self):
+        """Validate form inputs"""
+        error = check_student(self.first_name_var.get().strip(), self.last_name_var.get().strip(),
+                              self.email_var.get().strip(), self.dob_var.get().strip(),
+                              self.status_var.get().strip())
+        if error:
+            messagebox.showerror("Error", error)
+            return False
 
         return True
 
@@ -332,203 +576,676 @@ class StudentManagementSystem:
         self.address_text.delete("1.0", tk.END)
         self.status_var.set("Active")
         self.selected_student_id = None
+        self.tree.selection_remove(self.tree.selection())
 
     def refresh_student_list(self):
         """Refresh the student list in the treeview"""
+        if self.archive_rows is not None:
+            # Archive results are a ranked search, so rerun it
+            self.start_search()
+            return
+        with self.instrumentation.timed('list.refresh'):
+            self.list_generation += 1
+            self.list_counting = None
+            if self.snapshot_mode():
+                self.list_view = self.repo.student_snapshot().view(
+                    self.list_sort, self.status_filter(), self.search_var.get())
+                self.list_total = len(self.list_view)
+            else:
+                self.list_view = None
+                self.list_total = self.repo.count_students(self.list_filter_sql, self.list_filter_params)
+            self.window_rows = []
+            self.window_start = 0
+            self.show_list_offset(self.list_offset)
+
+    def load_first_page(self):
+        """Show the first page of the list and count the students in the background
+
+        COUNT(*) reads a whole index, so at startup the rows go on screen
+        first and the scrollbar gets its real range once the count, run on a
+        pooled connection, comes back. Until then the list only scrolls
+        through the rows already loaded.
+        """
+        self.list_generation += 1
+        generation = self.list_generation
+        self.list_view = None
+        self.window_rows = self.fetch_student_page(LIST_VISIBLE_ROWS + LIST_OVERSCAN)
+        self.window_start = 0
+        self.list_total = len(self.window_rows)
+        self.list_counting = generation
+        self.show_list_offset(0)
+
+        results = queue.Queue()
+        started = time.perf_counter()
+
+        def count():
+            try:
+                with self.repo.readers.connection() as conn:
+                    results.put(self.repo.count_students(conn=conn))
+            except Exception as e:
+                results.put(e)
+
+        def poll():
+            try:
+                total = results.get_nowait()
+            except queue.Empty:
+                self.root.after(COUNT_POLL_MS, poll)
+                return
+
+            record_startup(self.instrumentation, 'count', started, self.startup_timing)
+            if self.list_counting != generation:
+                # The list was refreshed with an exact count meanwhile
+                return
+            self.list_counting = None
+            if isinstance(total, Exception) or generation != self.list_generation:
+                self.refresh_student_list()
+                return
+            self.list_total = total
+            self.show_list_offset(self.list_offset)
+
+        threading.Thread(target=count, daemon=True).start()
+        self.root.after(COUNT_POLL_MS, poll)
+
+    def snapshot_mode(self):
+        """Return True if the list is sorted or filtered client-side"""
+        return bool(self.list_sort) or self.status_filter_var.get() != "All"
+
+    def status_filter(self):
+        """Return the statuses picked in the status filter, or None for all"""
+        status = self.status_filter_var.get()
+        return None if status == "All" else (status,)
+
+    def sort_list(self, column, add=False):
+        """Sort the list by a column heading
+
+        A click sorts by that column alone, or flips its direction if it
+        already leads; add (Shift-click) appends it as the next sort key or
+        flips it if it is already one.
+        """
+        field = LIST_FIELDS[column]
+        keys = [key for key, _ in self.list_sort]
+        if add and field in keys:
+            index = keys.index(field)
+            self.list_sort[index] = (field, not self.list_sort[index][1])
+        elif add:
+            self.list_sort.append((field, False))
+        elif keys[:1] == [field]:
+            self.list_sort = [(field, not self.list_sort[0][1])]
+        else:
+            self.list_sort = [(field, False)]
+
+        self.show_sort_headings()
+        self.include_archived_var.set(False)
+        self.archive_rows = None
+        self.search_generation += 1
+        self.list_offset = 0
+        self.refresh_student_list()
+
+    def on_heading_shift_click(self, event):
+        """Add a column to the sort with Shift-click on its heading"""
+        if self.tree.identify_region(event.x, event.y) != 'heading':
+            return None
+        column = self.tree.identify_column(event.x)
+        self.sort_list(LIST_COLUMNS[int(column[1:]) - 1], add=True)
+        return "break"
+
+    def show_sort_headings(self):
+        """Mark the sorted columns with their direction and rank"""
+        ranks = {field: (rank, descending) for rank, (field, descending) in enumerate(self.list_sort)}
+        for column in LIST_COLUMNS:
+            rank = ranks.get(LIST_FIELDS[column])
+            text = column
+            if rank is not None:
+                text += " \u25bc" if rank[1] else " \u25b2"
+                if len(ranks) > 1:
+                    text += str(rank[0] + 1)
+            self.tree.heading(column, text=text)
+
+    def on_status_filter(self, event):
+        """Filter the list by status"""
+        self.list_offset = 0
+        self.include_archived_var.set(False)
+        if self.snapshot_mode():
+            self.archive_rows = None
+            self.search_generation += 1
+            self.refresh_student_list()
+        else:
+            self.start_search()
+
+    def on_include_archived(self):
+        """Search the archive as well, or go back to current students
+
+        Archived matches are a ranked search of both tables, so sorting and
+        the status filter are reset while it is on.
+        """
+        if self.include_archived_var.get():
+            self.list_sort = []
+            self.show_sort_headings()
+            self.status_filter_var.set("All")
+        self.list_offset = 0
+        self.start_search()
+
+    def fetch_student_page(self, limit, after=None, before=None, offset=0):
+        """Fetch one page of the list under the current filter"""
+        rows = self.repo.fetch_student_page(limit, self.list_filter_sql, self.list_filter_params,
+                                            after=after, before=before, offset=offset)
+        self.repo.prefetch_students([row[0] for row in rows])
+        return rows
+
+    def load_list_window(self, offset):
+        """Make sure the cached window covers the rows visible at offset"""
+        if self.archive_rows is not None:
+            self.window_rows = self.archive_rows
+            self.window_start = 0
+            return
+        if self.list_view is not None:
+            snapshot = self.repo.snapshot
+            self.window_rows = [snapshot.row(i) for i in self.list_view[offset:offset + LIST_VISIBLE_ROWS]]
+            self.window_start = offset
+            return
+
+        window_end = self.window_start + len(self.window_rows)
+        if self.window_rows and self.window_start <= offset \
+                and offset + LIST_VISIBLE_ROWS <= window_end:
+            return
+        if self.window_rows and window_end == self.list_total and offset >= self.window_start:
+            return
+
+        start = max(0, offset - LIST_OVERSCAN)
+        end = min(self.list_total, offset + LIST_VISIBLE_ROWS + LIST_OVERSCAN)
+
+        if self.window_rows and self.window_start <= start <= window_end < end:
+            rows = self.fetch_student_page(end - window_end,
+                                           after=self.repo.list_key(self.window_rows[-1]))
+            self.window_rows = self.window_rows[start - self.window_start:] + rows
+        elif self.window_rows and start < self.window_start <= end <= window_end:
+            rows = self.fetch_student_page(self.window_start - start,
+                                           before=self.repo.list_key(self.window_rows[0]))
+            self.window_rows = rows + self.window_rows[:end - self.window_start]
+        else:
+            self.window_rows = self.fetch_student_page(end - start, offset=start)
+        self.window_start = start
+
+    def show_list_offset(self, offset):
+        """Scroll the virtual list so that offset is the first visible row"""
+        with self.instrumentation.timed('list.render'):
+            self.render_list_offset(offset)
+
+    def render_list_offset(self, offset):
+        """Fill the treeview with the rows visible at offset"""
+        offset = max(0, min(offset, self.list_total - LIST_VISIBLE_ROWS))
+        self.list_offset = offset
+        self.load_list_window(offset)
+
+        first = offset - self.window_start
+        rows = self.window_rows[first:first + LIST_VISIBLE_ROWS]
+        wanted = {str(row[0]) for row in rows}
+
         
         for item in self.tree.get_children():
-            self.tree.delete(item)
+            if item not in wanted:
+                self.tree.delete(item)
+                del self.displayed_rows[item]
+
+        for index, row in enumerate(rows):
+            iid = str(row[0])
+            shown = self.displayed_rows.get(iid)
+            if shown is None:
+                self.tree.insert("", index, iid=iid, values=row)
+            else:
+                if shown != row:
+                    self.tree.item(iid, values=row)
+                if self.tree.index(iid) != index:
+                    self.tree.move(iid, "", index)
+            self.displayed_rows[iid] = row
+
+        selected = str(self.selected_student_id)
+        if self.tree.exists(selected) and selected not in self.tree.selection():
+            self.tree.selection_set(selected)
+
+        if self.list_total:
+            self.v_scrollbar.set(offset / self.list_total,
+                                 min(1.0, (offset + LIST_VISIBLE_ROWS) / self.list_total))
+        else:
+            self.v_scrollbar.set(0.0, 1.0)
+
+    def get_list_row(self, student_id):
+        """Return the list row of a student if it passes the current filter"""
+        return self.repo.get_list_row(student_id, self.list_filter_sql, self.list_filter_params)
+
+    def locate_list_key(self, key):
+        """Place a list key relative to the cached window
+
+        Returns 'before' or 'after' when the key sorts outside the window,
+        otherwise 'inside' and the index it has or would have in the window.
+        """
+        window_end = self.window_start + len(self.window_rows)
+        if self.window_rows:
+            if key < self.repo.list_key(self.window_rows[0]) and self.window_start > 0:
+                return 'before', None
+            if key > self.repo.list_key(self.window_rows[-1]) and window_end < self.list_total:
+                return 'after', None
+
+        low, high = 0, len(self.window_rows)
+        while low < high:
+            middle = (low + high) // 2
+            if self.repo.list_key(self.window_rows[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return 'inside', low
+
+    def apply_list_change(self, old_row, new_row, generation):
+        """Patch the list after one student was added, updated or deleted
+
+        old_row and new_row are the student's list rows before and after
+        the write (None when the student was or is not in the list). The
+        cached window is shifted or patched in place and only the affected
+        tree items are touched, instead of reloading the whole list. If the
+        list was reloaded or patched since the write was queued (generation
+        changed), old_row may be out of date, so the list is reloaded instead.
+        """
+        if generation != self.list_generation or self.list_view is not None \
+                or self.archive_rows is not None:
+            self.refresh_student_list()
+            return
+        self.list_generation += 1
+
+        if old_row is not None:
+            where, index = self.locate_list_key(self.repo.list_key(old_row))
+            if where == 'inside':
+                if index >= len(self.window_rows) or self.window_rows[index][0] != old_row[0]:
+                    
+                    self.refresh_student_list()
+                    return
+                del self.window_rows[index]
+                if self.window_start + index < self.list_offset:
+                    self.list_offset -= 1
+            elif where == 'before':
+                self.window_start -= 1
+                self.list_offset -= 1
+            self.list_total -= 1
+
+        if new_row is not None:
+            where, index = self.locate_list_key(self.repo.list_key(new_row))
+            if where == 'inside':
+                self.window_rows.insert(index, new_row)
+                if self.window_start + index < self.list_offset:
+                    self.list_offset += 1
+            elif where == 'before':
+                self.window_start += 1
+                self.list_offset += 1
+            self.list_total += 1
+
+        self.show_list_offset(self.list_offset)
+
+    def on_list_scroll(self, action, amount, unit=None):
+        """Handle the vertical scrollbar of the virtual list"""
+        if action == tk.MOVETO:
+            offset = int(float(amount) * self.list_total)
+        elif unit == tk.PAGES:
+            offset = self.list_offset + int(amount) * LIST_VISIBLE_ROWS
+        else:
+            offset = self.list_offset + int(amount)
 
         
-        self.cursor.execute("""
-            SELECT student_id, first_name, last_name, email, phone, status 
-            FROM students ORDER BY last_name, first_name
-        """)
+        if self.scroll_job:
+            self.root.after_cancel(self.scroll_job)
+        self.scroll_job = self.root.after_idle(self.run_scroll_job, offset)
+
+    def run_scroll_job(self, offset):
+        """Apply a coalesced scroll request"""
+        self.scroll_job = None
+        self.show_list_offset(offset)
+
+    def on_list_wheel(self, event):
+        """Scroll the virtual list with the mouse wheel"""
+        if event.num == 4 or event.delta > 0:
+            step = -3
+        else:
+            step = 3
+        self.show_list_offset(self.list_offset + step)
+        return "break"
+
+    def on_list_key(self, event):
+        """Move through the virtual list with the keyboard, paging at the edges"""
+        items = self.tree.get_children()
+        if not items:
+            return None
+
+        focus = self.tree.focus()
+        index = items.index(focus) if focus in items else 0
+        position = self.list_offset + index
+
+        if event.keysym == 'Up':
+            position -= 1
+        elif event.keysym == 'Down':
+            position += 1
+        elif event.keysym == 'Prior':
+            position -= LIST_VISIBLE_ROWS
+        elif event.keysym == 'Next':
+            position += LIST_VISIBLE_ROWS
+        elif event.keysym == 'Home':
+            position = 0
+        else:
+            position = self.list_total - 1
+        position = max(0, min(position, self.list_total - 1))
 
-        for row in self.cursor.fetchall():
-            self.tree.insert("", "end", values=row)
+        if position < self.list_offset:
+            self.show_list_offset(position)
+        elif position >= self.list_offset + LIST_VISIBLE_ROWS:
+            self.show_list_offset(position - LIST_VISIBLE_ROWS + 1)
+
+        items = self.tree.get_children()
+        item = items[position - self.list_offset]
+        self.tree.focus(item)
+        self.tree.selection_set(item)
+        return "break"
 
     def on_student_select(self, event):
         """Handle student selection in treeview"""
         selection = self.tree.selection()
         if selection:
-            item = self.tree.item(selection[0])
-            values = item['values']
+            student_id = int(selection[0])
+            if student_id == self.selected_student_id:
+                return
 
             
-            self.selected_student_id = values[0]
+            self.selected_student_id = student_id
 
             
-            self.cursor.execute("""
-                SELECT first_name, last_name, email, phone, date_of_birth, address, status
-                FROM students WHERE student_id=?
-            """, (self.selected_student_id,))
-
-            student_data = self.cursor.fetchone()
-            if student_data:
-                self.first_name_var.set(student_data[0])
-                self.last_name_var.set(student_data[1])
-                self.email_var.set(student_data[2])
-                self.phone_var.set(student_data[3] or "")
-                self.dob_var.set(student_data[4] or "")
+            student = self.repo.get_student(self.selected_student_id)
+            if student:
+                self.first_name_var.set(student['first_name'])
+                self.last_name_var.set(student['last_name'])
+                self.email_var.set(student['email'])
+                self.phone_var.set(student['phone'] or "")
+                self.dob_var.set(student['date_of_birth'] or "")
 
             
                 self.address_text.delete("1.0", tk.END)
-                if student_data[5]:
-                    self.address_text.insert("1.0", student_data[5])
-
-                self.status_var.set(student_data[6])
+                if student['address']:
+                    self.address_text.insert("1.0", student['address'])
+
+                self.status_var.set(student['status'])
+            elif student_id in self.archived_ids:
+                # Archived students are not editable, so do not leave another student's details up
+                for var in (self.first_name_var, self.last_name_var, self.email_var,
+                            self.phone_var, self.dob_var):
+                    var.set("")
+                self.address_text.delete("1.0", tk.END)
 
     def on_search(self, event):
         """Handle search functionality"""
-        search_term = self.search_var.get().strip()
+        if self.search_job:
+            self.root.after_cancel(self.search_job)
+            self.search_job = None
+        if self.snapshot_mode():
+            self.search_generation += 1
+            self.list_offset = 0
+            self.refresh_student_list()
+            return
+        self.search_job = self.root.after(SEARCH_DEBOUNCE_MS, self.start_search)
+
+    def start_search(self):
+        """Hand the current search term to the search worker"""
+        self.search_job = None
+        self.search_generation += 1
+        self.search_requests.put((self.search_generation, self.search_var.get().strip(),
+                                  self.include_archived_var.get()))
+        if not self.search_poll_job:
+            self.search_poll_job = self.root.after(SEARCH_POLL_MS, self.poll_search_results)
+
+    def search_worker(self):
+        """Run searches on a private read-only connection off the Tk thread"""
+        repo = None
+        while True:
+            generation, search_term, include_archived = self.search_requests.get()
+            while not self.search_requests.empty():
+                generation, search_term, include_archived = self.search_requests.get()
+            if generation != self.search_generation:
+                continue
 
-        
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+            try:
+                if repo is None:
+                    repo = StudentRepository(self.repo.db_path, read_only=True,
+                                             instrumentation=self.query_instrumentation)
+                    
+                    repo.conn.set_progress_handler(
+                        lambda: generation != self.search_generation, 1000)
+
+                with self.instrumentation.timed('search.query'):
+                    if include_archived and search_term:
+                        # Archived rows have no place in the keyset paging, so the
+                        # best matches of both tables come back in one ranked list
+                        rows = repo.search_students(search_term, ARCHIVE_SEARCH_LIMIT,
+                                                    include_archived=True)
+                        self.search_results.put((generation, None, None, None, rows))
+                        continue
+                    filter_sql, params = repo.build_search_filter(search_term)
+                    total = repo.count_students(filter_sql, params)
+                    rows = repo.fetch_student_page(LIST_VISIBLE_ROWS + LIST_OVERSCAN, filter_sql, params)
+            except sqlite3.Error:
+                
+                self.search_results.put((generation, None, None, None, None))
+                continue
+
+            self.search_results.put((generation, filter_sql, params, total, rows))
+
+    def poll_search_results(self):
+        """Apply the newest search result, dropping superseded ones"""
+        self.search_poll_job = None
+        latest = None
+        while not self.search_results.empty():
+            result = self.search_results.get()
+            if result[0] == self.search_generation:
+                latest = result
+
+        if latest is None:
+            self.search_poll_job = self.root.after(SEARCH_POLL_MS, self.poll_search_results)
+            return
 
-        if search_term:
-            
-            self.cursor.execute("""
-                SELECT student_id, first_name, last_name, email, phone, status 
-                FROM students 
-                WHERE first_name LIKE ? OR last_name LIKE ? OR email LIKE ? OR phone LIKE ?
-                ORDER BY last_name, first_name
-            """, (f"%{search_term}%", f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"))
-        else:
-            
-            self.cursor.execute("""
-                SELECT student_id, first_name, last_name, email, phone, status 
-                FROM students ORDER BY last_name, first_name
-            """)
+        if latest[4] is None:
+            return
 
-        for row in self.cursor.fetchall():
-            self.tree.insert("", "end", values=row)
+        if latest[3] is None:
+            self.show_archive_results(latest[4])
+            return
+
+        _, self.list_filter_sql, self.list_filter_params, self.list_total, rows = latest
+        self.list_generation += 1
+        self.list_view = None
+        self.archive_rows = None
+        self.archived_ids = set()
+        self.repo.prefetch_students([row[0] for row in rows])
+        self.window_start = 0
+        self.window_rows = rows
+        self.show_list_offset(0)
+
+    def show_archive_results(self, rows):
+        """Show ranked search results that include archived students"""
+        self.list_generation += 1
+        self.list_view = None
+        self.archived_ids = {row[0] for row in rows if row[-1]}
+        self.archive_rows = [row[:5] + (row[5] + " (archived)" if row[-1] else row[5],)
+                             for row in rows]
+        self.repo.prefetch_students([row[0] for row in rows if not row[-1]])
+        self.list_total = len(rows)
+        self.show_list_offset(0)
 
     def clear_search(self):
-        """Clear search and refresh list"""
+        """Clear search, status filter, archive option and sort and refresh list"""
         self.search_var.set("")
-        self.refresh_student_list()
+        self.status_filter_var.set("All")
+        self.include_archived_var.set(False)
+        self.list_sort = []
+        self.show_sort_headings()
+        if self.search_job:
+            self.root.after_cancel(self.search_job)
+            self.search_job = None
+        self.start_search()
 
     def export_csv(self):
-        """Export student data to CSV"""
-        try:
-            filename = filedialog.asksaveasfilename(
-                defaultextension=".csv",
-                filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
-            )
+        """Export student data to CSV or JSON Lines, optionally gzipped"""
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("JSON Lines files", "*.jsonl"),
+                       ("Gzipped CSV files", "*.csv.gz"),
+                       ("Gzipped JSON Lines files", "*.jsonl.gz"), ("All files", "*.*")]
+        )
+        if not filename:
+            return
 
-            if filename:
-                self.cursor.execute("""
-                    SELECT student_id, first_name, last_name, email, phone, 
-                           date_of_birth, enrollment_date, address, status 
-                    FROM students ORDER BY last_name, first_name
-                """)
+        def work(report, cancelled):
+            return self.repo.export_students(filename, report, cancelled)
 
-                with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow(['ID', 'First Name', 'Last Name', 'Email', 'Phone', 
-                                   'Date of Birth', 'Enrollment Date', 'Address', 'Status'])
-                    writer.writerows(self.cursor.fetchall())
+        def on_done(exported):
+            if exported is None:
+                messagebox.showinfo("Export Cancelled", "Export cancelled")
+            else:
+                messagebox.showinfo("Success", f"Exported {exported} students to {filename}")
+
+        self.run_task("Exporting Students", work, on_done, "Failed to export data")
 
-                messagebox.showinfo("Success", f"Data exported to {filename}")
+    def run_task(self, title, work, on_done, error_message):
+        """Run work(report, cancelled) on a thread behind a progress dialog"""
+        dialog = ProgressDialog(self.root, title)
+        messages = queue.Queue()
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to export data: {str(e)}")
+        def report(fraction, message):
+            messages.put(('progress', fraction, message))
+
+        def target():
+            try:
+                with self.instrumentation.timed(f'task.{title}'):
+                    result = work(report, dialog.cancelled)
+                messages.put(('done', result))
+            except Exception as e:
+                messages.put(('error', e))
+
+        def poll():
+            while True:
+                try:
+                    message = messages.get_nowait()
+                except queue.Empty:
+                    self.root.after(TASK_POLL_MS, poll)
+                    return
+
+                if message[0] == 'progress':
+                    dialog.update(message[1], message[2])
+                    continue
+
+                dialog.close()
+                if message[0] == 'error':
+                    messagebox.showerror("Error", f"{error_message}: {str(message[1])}")
+                else:
+                    on_done(message[1])
+                return
+
+        threading.Thread(target=target, daemon=True).start()
+        self.root.after(TASK_POLL_MS, poll)
 
     def import_csv(self):
         """Import student data from CSV"""
-        try:
-            filename = filedialog.askopenfilename(
-                filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
-            )
-
-            if filename:
-                with open(filename, 'r', encoding='utf-8') as csvfile:
-                    reader = csv.DictReader(csvfile)
-                    imported_count = 0
-
-                    for row in reader:
-                        try:
-                            self.cursor.execute("""
-                                INSERT INTO students (first_name, last_name, email, phone, 
-                                                    date_of_birth, address, status)
-                                VALUES (?, ?, ?, ?, ?, ?, ?)
-                            """, (
-                                row.get('First Name', '').strip(),
-                                row.get('Last Name', '').strip(),
-                                row.get('Email', '').strip(),
-                                row.get('Phone', '').strip(),
-                                row.get('Date of Birth', '').strip() or None,
-                                row.get('Address', '').strip(),
-                                row.get('Status', 'Active').strip()
-                            ))
-                            imported_count += 1
-                        except sqlite3.IntegrityError:
-                            
-                            continue
-
-                    self.conn.commit()
-                    self.refresh_student_list()
-                    messagebox.showinfo("Success", f"Imported {imported_count} students")
+        filename = filedialog.askopenfilename(
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+        )
+        if not filename:
+            return
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to import data: {str(e)}")
+        upsert = messagebox.askyesnocancel(
+            "Import CSV", "Update existing students whose email is already on file?\n\n"
+                          "Yes: update them    No: skip them")
+        if upsert is None:
+            return
 
-    def generate_report(self):
-        """Generate a simple text report"""
-        try:
-            filename = filedialog.asksaveasfilename(
-                defaultextension=".txt",
-                filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
-            )
-
-            if filename:
-                self.cursor.execute("SELECT COUNT(*) FROM students")
-                total_students = self.cursor.fetchone()[0]
-
-                self.cursor.execute("SELECT COUNT(*) FROM students WHERE status='Active'")
-                active_students = self.cursor.fetchone()[0]
-
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write("STUDENT MANAGEMENT SYSTEM REPORT\n")
-                    f.write("=" * 40 + "\n\n")
-                    f.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-                    f.write(f"Total Students: {total_students}\n")
-                    f.write(f"Active Students: {active_students}\n")
-                    f.write(f"Inactive Students: {total_students - active_students}\n\n")
+        check_duplicates = messagebox.askyesno(
+            "Import CSV", "Also check the file for likely duplicates of students already on "
+                          "file under another email?\n\nThey are still imported and listed in a "
+                          "file next to the CSV for review.")
 
-                    
-                    f.write("STUDENT LIST:\n")
-                    f.write("-" * 20 + "\n")
+        def work(report, cancelled):
+            return self.repo.import_students(filename, upsert, report, cancelled,
+                                             check_duplicates=check_duplicates)
+
+        self.run_task("Importing Students", work, self.on_import_done, "Failed to import data")
 
-                    self.cursor.execute("""
-                        SELECT first_name, last_name, email, status 
-                        FROM students ORDER BY last_name, first_name
-                    """)
+    def on_import_done(self, summary):
+        """Report the outcome of a CSV import"""
+        if summary['cancelled']:
+            messagebox.showinfo("Import Cancelled", "Import cancelled, no students were changed")
+            return
+
+        self.refresh_student_list()
+        message = (f"Imported {summary['imported']} students\n"
+                   f"Skipped {summary['skipped']} existing emails\n"
+                   f"Rejected {summary['rejected']} rows")
+        if summary['rejected_file']:
+            message += f"\n\nRejected rows written to {summary['rejected_file']}"
+        if summary['duplicates_file']:
+            message += (f"\n\nFlagged {summary['duplicates']} likely duplicates, "
+                        f"listed in {summary['duplicates_file']}:")
+            with open(summary['duplicates_file'], newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                next(reader)
+                for score, first, last, email, _, _, match_id in islice(reader, IMPORT_DUPLICATES_SHOWN):
+                    message += f"\n{first} {last} <{email}> ~ student {match_id} ({float(score):.0%})"
+            if summary['duplicates'] > IMPORT_DUPLICATES_SHOWN:
+                message += "\n..."
+        messagebox.showinfo("Success", message)
 
-                    for row in self.cursor.fetchall():
-                        f.write(f"{row[1]}, {row[0]} - {row[2]} ({row[3]})\n")
+    def generate_report(self):
+        """Generate the text report"""
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".txt",
+            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+        )
+        if not filename:
+            return
 
+        def work(report, cancelled):
+            return self.repo.write_report(filename, report=report, cancelled=cancelled)
+
+        def on_done(summary):
+            if summary is None:
+                messagebox.showinfo("Report Cancelled", "Report cancelled")
+            else:
                 messagebox.showinfo("Success", f"Report generated: {filename}")
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate report: {str(e)}")
+        self.run_task("Generating Report", work, on_done, "Failed to generate report")
+
+    def show_diagnostics(self):
+        """Open the diagnostics window"""
+        DiagnosticsDialog(self.root, self.instrumentation, self.query_instrumentation is not None)
 
     def __del__(self):
         """Close database connection"""
-        if hasattr(self, 'conn'):
-            self.conn.close()
+        if hasattr(self, 'repo'):
+            self.repo.close()
 
 def main():
     """Main function to run the application"""
+    parser = argparse.ArgumentParser(description="Student Management System")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH,
+                        help=f"database file, e.g. one campus (default: {DEFAULT_DB_PATH})")
+    parser.add_argument('--startup-timing', action='store_true',
+                        help="print how long each startup phase took to stderr")
+    parser.add_argument('--profile', action='store_true',
+                        help="record SQL statement timings for Diagnostics (slows queries down)")
+    args = parser.parse_args()
+
+    instrumentation = Instrumentation()
+    record_startup(instrumentation, 'imports', STARTED, args.startup_timing)
+
+    started = time.perf_counter()
     root = tk.Tk()
 
     
     style = ttk.Style()
     style.theme_use('clam')  
+    record_startup(instrumentation, 'tk', started, args.startup_timing)
 
-    app = StudentManagementSystem(root)
+    app = StudentManagementSystem(root, instrumentation, args.startup_timing, args.db, args.profile)
 
     
     root.update_idletasks()
@@ -536,6 +1253,12 @@ def main():
     y = (root.winfo_screenheight() // 2) - (root.winfo_height() // 2)
     root.geometry(f"+{x}+{y}")
 
+    def on_map(event):
+        if event.widget is root:
+            root.unbind('<Map>')
+            record_startup(instrumentation, 'shown', STARTED, args.startup_timing)
+
+    root.bind('<Map>', on_map)
     root.mainloop()
 
 if __name__ == "__main__":
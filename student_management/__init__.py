@@ -0,0 +1,37 @@
+"""Headless data access for the Student Management System
+
+Nothing in this package imports tkinter, so it can be used from scripts,
+scheduled jobs and the command line as well as from the desktop app.
+The public names are imported from their modules on first use, so
+importing the package loads none of them, and campus queries only load
+for programs that use CampusFederation.
+"""
+
+import importlib
+
+# Public name -> module it is defined in
+LAZY_EXPORTS = {
+    'CampusFederation': 'federation',
+    'CourseRepository': 'courses',
+    'DEFAULT_DB_PATH': 'repository',
+    'ENROLLMENT_STATUSES': 'courses',
+    'Instrumentation': 'instrumentation',
+    'LIST_COLUMNS': 'repository',
+    'STUDENT_STATUSES': 'reports',
+    'StudentRepository': 'repository',
+}
+
+__all__ = ['DEFAULT_DB_PATH', 'ENROLLMENT_STATUSES', 'LIST_COLUMNS', 'STUDENT_STATUSES',
+           'CampusFederation', 'CourseRepository', 'Instrumentation', 'StudentRepository']
+
+def __getattr__(name):
+    """Import the module behind a public name the first time it is used"""
+    module = LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(LAZY_EXPORTS))
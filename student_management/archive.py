@@ -0,0 +1,79 @@
+"""Moving students and their enrollments to and from the archive tables
+
+Archiving keeps students, enrollments and their indexes limited to the
+students the default list, search and reports care about. A student and
+all of their enrollments always move together, in batches of
+ARCHIVE_BATCH_SIZE inside one transaction, so a cancelled or failed run
+leaves nothing half-moved.
+"""
+
+import threading
+from datetime import datetime
+
+ARCHIVE_STATUSES = ('Graduated', 'Inactive')
+ARCHIVE_BATCH_SIZE = 500
+STUDENT_COLUMNS = ('student_id, first_name, last_name, email, phone, date_of_birth, '
+                   'enrollment_date, address, status')
+ENROLLMENT_COLUMNS = 'enrollment_id, student_id, course_id, enrollment_date, grade, status'
+
+def move_students(conn, student_ids, restore=False, report=None, cancelled=None):
+    """Move students and their enrollments into the archive, or back with restore
+
+    Runs in one transaction on conn and returns the number of students
+    moved, or None if cancelled (everything is rolled back). Restoring a
+    student whose email has since been taken raises IntegrityError.
+    """
+    report = report or (lambda fraction, message: None)
+    cancelled = cancelled or threading.Event()
+    if restore:
+        source, target, verb = 'archived_', '', "Restored"
+        student_columns = select_students = STUDENT_COLUMNS
+        enrollment_columns = select_enrollments = ENROLLMENT_COLUMNS
+    else:
+        source, target, verb = '', 'archived_', "Archived"
+        student_columns = STUDENT_COLUMNS + ', archived_at'
+        select_students = STUDENT_COLUMNS + ', :archived_at'
+        enrollment_columns = ENROLLMENT_COLUMNS + ', archived_at'
+        select_enrollments = ENROLLMENT_COLUMNS + ', :archived_at'
+
+    archived_at = datetime.now().isoformat(timespec='seconds')
+    total = len(student_ids) or 1
+    moved = 0
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for start in range(0, len(student_ids), ARCHIVE_BATCH_SIZE):
+            if cancelled.is_set():
+                conn.rollback()
+                return None
+            chunk = student_ids[start:start + ARCHIVE_BATCH_SIZE]
+            params = {f'id{i}': student_id for i, student_id in enumerate(chunk)}
+            ids = ', '.join(f':{name}' for name in params)
+            params['archived_at'] = archived_at
+
+            # Students first: restored enrollments reference them
+            cursor = conn.execute(f"""
+                INSERT INTO {target}students ({student_columns})
+                SELECT {select_students} FROM {source}students WHERE student_id IN ({ids})
+            """, params)
+            moved += cursor.rowcount
+            conn.execute(f"""
+                INSERT INTO {target}enrollments ({enrollment_columns})
+                SELECT {select_enrollments} FROM {source}enrollments WHERE student_id IN ({ids})
+            """, params)
+            conn.execute(f"DELETE FROM {source}enrollments WHERE student_id IN ({ids})", params)
+            conn.execute(f"DELETE FROM {source}students WHERE student_id IN ({ids})", params)
+            report((start + len(chunk)) / total, f"{verb} {moved} students...")
+        conn.commit()
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    return moved
+
+def archive_by_status(conn, statuses=ARCHIVE_STATUSES, report=None, cancelled=None):
+    """Archive every student whose status is one of statuses"""
+    cursor = conn.execute(f"""
+        SELECT student_id FROM students WHERE status IN ({','.join('?' * len(statuses))})
+    """, tuple(statuses))
+    student_ids = [row[0] for row in cursor.fetchall()]
+    return move_students(conn, student_ids, report=report, cancelled=cancelled)
@@ -0,0 +1,50 @@
+"""Bounded LRU cache for student detail records"""
+
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    """Least-recently-used mapping with a size bound, safe across threads"""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Return the cached value and mark it as recently used"""
+        with self.lock:
+            try:
+                self.data.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return self.data[key]
+
+    def put(self, key, value):
+        """Cache a value, evicting the least recently used entry if full"""
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            if len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def pop(self, key):
+        """Drop one entry if it is cached"""
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry"""
+        with self.lock:
+            self.data.clear()
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.data
+
+    def __len__(self):
+        return len(self.data)
@@ -0,0 +1,150 @@
+"""Incremental change feeds built on change_log
+
+Every insert, update and delete on students, courses and enrollments is
+logged with an increasing seq. export_changes writes one JSON line per
+row changed in a seq window, carrying the row as it is now (or a delete),
+so a nightly feed reads only what changed instead of whole tables. Named
+feeds keep their last exported seq in export_checkpoints; derived
+tables that follow the log keep theirs in log_positions.
+"""
+
+import json
+import threading
+from datetime import datetime
+
+CHANGE_BATCH_SIZE = 500
+FEED_TABLES = {
+    'students': 'student_id',
+    'courses': 'course_id',
+    'enrollments': 'enrollment_id',
+}
+
+def log_bounds(cursor):
+    """Return (oldest, newest) seq still in change_log, (None, 0) if empty"""
+    cursor.execute("SELECT MIN(seq), COALESCE(MAX(seq), 0) FROM change_log")
+    return cursor.fetchone()
+
+def get_checkpoint(cursor, feed):
+    """Return the last seq exported by a named feed, or None"""
+    cursor.execute("SELECT seq FROM export_checkpoints WHERE feed = ?", (feed,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def save_checkpoint(conn, feed, seq):
+    """Record that a feed has exported everything up to seq"""
+    conn.execute("""
+        INSERT OR REPLACE INTO export_checkpoints (feed, seq, exported_at) VALUES (?, ?, ?)
+    """, (feed, seq, datetime.now().isoformat(timespec='seconds')))
+    conn.commit()
+
+def get_position(cursor, name):
+    """Return the last seq a derived table has applied, or None"""
+    cursor.execute("SELECT seq FROM log_positions WHERE name = ?", (name,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def save_position(conn, name, seq):
+    """Record that a derived table has applied everything up to seq"""
+    conn.execute("INSERT OR REPLACE INTO log_positions (name, seq) VALUES (?, ?)", (name, seq))
+    conn.commit()
+
+def prune_change_log(conn):
+    """Delete log entries every feed and derived table has read; return the count
+
+    Nothing is deleted until at least one of them has a position. The
+    newest entry is always kept so seq keeps counting up and readers can
+    tell from MIN(seq) that older entries are gone.
+    """
+    cursor = conn.execute("""
+        DELETE FROM change_log
+        WHERE seq <= (SELECT MIN(seq) FROM (SELECT seq FROM export_checkpoints
+                                            UNION ALL SELECT seq FROM log_positions))
+          AND seq < (SELECT MAX(seq) FROM change_log)
+    """)
+    conn.commit()
+    return cursor.rowcount
+
+def open_feed(filename):
+    """Open a JSON Lines file for writing, gzipped if it ends in .gz"""
+    if filename.lower().endswith('.gz'):
+        import gzip
+        return gzip.open(filename, 'wt', encoding='utf-8')
+    return open(filename, 'w', encoding='utf-8')
+
+def write_rows(cursor, f, table, ids, seqs):
+    """Write the current rows of ids in table, and deletes for missing ones"""
+    key = FEED_TABLES[table]
+    cursor.execute(f"SELECT * FROM {table} WHERE {key} IN ({','.join('?' * len(ids))})", ids)
+    columns = [d[0] for d in cursor.description]
+    rows = {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+    for row_id in ids:
+        row = rows.get(row_id)
+        f.write(json.dumps({'seq': seqs[row_id], 'table': table, 'id': row_id,
+                            'op': 'delete' if row is None else 'upsert', 'row': row}) + "\n")
+
+def export_changes(conn, filename, since=None, report=None, cancelled=None):
+    """Write the changes after seq since to a JSON Lines file
+
+    Rows changed several times in the window appear once, in the order
+    of their last change. With since=None, or when the log no longer
+    reaches back to since, every current row is written as an upsert
+    instead. Everything is read in one transaction, so the file matches a
+    single point in time. Returns a summary dict with the seq the next
+    export should start after, or None if cancelled.
+    """
+    report = report or (lambda fraction, message: None)
+    cancelled = cancelled or threading.Event()
+
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    oldest, upto = log_bounds(cursor)
+    full = since is None or (oldest is not None and oldest > since + 1) or since > upto
+    written = 0
+
+    with open_feed(filename) as f:
+        if full:
+            totals = {}
+            for table in FEED_TABLES:
+                cursor.execute(f"SELECT COUNT(*) FROM {table}")
+                totals[table] = cursor.fetchone()[0]
+            total = sum(totals.values()) or 1
+
+            for table, key in FEED_TABLES.items():
+                cursor.execute(f"SELECT {key} FROM {table} ORDER BY {key}")
+                ids = [row[0] for row in cursor.fetchall()]
+                for start in range(0, len(ids), CHANGE_BATCH_SIZE):
+                    if cancelled.is_set():
+                        break
+                    chunk = ids[start:start + CHANGE_BATCH_SIZE]
+                    write_rows(cursor, f, table, chunk, dict.fromkeys(chunk, upto))
+                    written += len(chunk)
+                    report(written / total, f"Wrote {written} of {total} rows...")
+        else:
+            log = conn.cursor()
+            log.execute("""
+                SELECT table_name, row_id, MAX(seq) AS last_seq FROM change_log
+                WHERE seq > ? AND seq <= ?
+                GROUP BY table_name, row_id ORDER BY last_seq
+            """, (since, upto))
+
+            while not cancelled.is_set():
+                batch = log.fetchmany(CHANGE_BATCH_SIZE)
+                if not batch:
+                    break
+                # Consecutive runs of one table keep the output in seq order
+                run = []
+                for entry in batch + [(None, None, None)]:
+                    if run and entry[0] != run[0][0]:
+                        write_rows(cursor, f, run[0][0], [e[1] for e in run],
+                                   {e[1]: e[2] for e in run})
+                        run = []
+                    run.append(entry)
+                written += len(batch)
+                report((batch[-1][2] - since) / max(upto - since, 1),
+                       f"Wrote {written} changes...")
+            log.close()
+
+    conn.rollback()
+    if cancelled.is_set():
+        return None
+    return {'since': since, 'upto': upto, 'written': written, 'full': full}
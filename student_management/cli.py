@@ -0,0 +1,310 @@
+"""Command-line interface: python -m student_management <command>"""
+
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+from contextlib import nullcontext
+
+from .archive import ARCHIVE_STATUSES
+from .courses import parse_student_id
+from .instrumentation import Instrumentation
+from .reports import STUDENT_STATUSES
+from .repository import DEFAULT_DB_PATH, LIST_COLUMNS, StudentRepository
+
+def print_progress(fraction, message):
+    """Show import/export progress on stderr"""
+    print(f"\r{fraction:6.1%}  {message}", end="", file=sys.stderr, flush=True)
+
+def cmd_import(repo, args):
+    """Import students from a CSV file"""
+    summary = repo.import_students(args.file, upsert=args.update,
+                                   report=None if args.quiet else print_progress,
+                                   workers=args.workers, check_duplicates=args.check_duplicates)
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"Imported {summary['imported']} students, skipped {summary['skipped']}, "
+          f"rejected {summary['rejected']}")
+    if summary['rejected_file']:
+        print(f"Rejected rows written to {summary['rejected_file']}")
+    if summary['duplicates_file']:
+        print(f"{summary['duplicates']} likely duplicates written to {summary['duplicates_file']}")
+    return 1 if summary['rejected'] else 0
+
+def cmd_export(repo, args):
+    """Export students to CSV or JSON Lines"""
+    exported = repo.export_students(args.file, report=None if args.quiet else print_progress)
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"Exported {exported} students to {args.file}")
+    return 0
+
+def cmd_changes(repo, args):
+    """Export changed rows since a seq or a feed checkpoint, or list feeds"""
+    if args.list:
+        for feed, seq, exported_at in repo.list_feeds():
+            print(f"{feed}\t{seq}\t{exported_at}")
+        return 0
+    if args.prune:
+        print(f"Pruned {repo.prune_change_log()} change log entries")
+        return 0
+    if not args.file:
+        raise SystemExit("changes: a file is required unless --list or --prune is given")
+
+    summary = repo.export_changes(args.file, since=args.since, feed=args.feed,
+                                  report=None if args.quiet else print_progress)
+    if not args.quiet:
+        print(file=sys.stderr)
+    kind = "rows (full export)" if summary['full'] else "changes"
+    print(f"Wrote {summary['written']} {kind} up to seq {summary['upto']} to {args.file}")
+    return 0
+
+def cmd_duplicates(repo, args):
+    """List likely duplicate students with their scores"""
+    pairs = repo.find_duplicates(args.threshold, report=None if args.quiet else print_progress)
+    if not args.quiet:
+        print(file=sys.stderr)
+    repo.prefetch_students({i for pair in pairs for i in pair[1:]})
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        writer = csv.writer(out, delimiter=',' if args.output else '\t')
+        writer.writerow(['Score', 'ID', 'Name', 'Email', 'Match ID', 'Match Name', 'Match Email'])
+        for score, student_id, other_id in pairs:
+            a, b = repo.get_student(student_id), repo.get_student(other_id)
+            writer.writerow([score, student_id, f"{a['first_name']} {a['last_name']}", a['email'],
+                             other_id, f"{b['first_name']} {b['last_name']}", b['email']])
+    finally:
+        if args.output:
+            out.close()
+    if args.output:
+        print(f"Wrote {len(pairs)} likely duplicates to {args.output}")
+    return 0
+
+def cmd_report(repo, args):
+    """Write the text report"""
+    repo.write_report(args.file, details=not args.summary_only, use_cache=not args.no_cache)
+    print(f"Report generated: {args.file}")
+    return 0
+
+def cmd_search(repo, args):
+    """Print the best matches for a search term"""
+    rows = repo.search_students(args.term, limit=args.limit, include_archived=args.archived)
+    if args.json:
+        keys = ['student_id', 'first_name', 'last_name', 'email', 'phone', 'status', 'archived']
+        for row in rows:
+            print(json.dumps(dict(zip(keys, row))))
+    else:
+        print("\t".join(LIST_COLUMNS + (('Archived',) if args.archived else ())))
+        for row in rows:
+            print("\t".join("" if v is None else str(v) for v in row))
+    return 0
+
+def campus_report(federation, args):
+    """Write one text report over every campus"""
+    federation.write_report(args.file, details=not args.summary_only, use_cache=not args.no_cache)
+    print(f"Report generated: {args.file}")
+    return 0
+
+def campus_search(federation, args):
+    """Print the best matches for a search term from every campus, most relevant first"""
+    if args.archived:
+        raise SystemExit("--archived works on a single database; use --db")
+    rows = federation.search_students(args.term, limit=args.limit)
+    if args.json:
+        keys = ['campus', 'student_id', 'first_name', 'last_name', 'email', 'phone', 'status']
+        for row in rows:
+            print(json.dumps(dict(zip(keys, row))))
+    else:
+        print("\t".join(('Campus',) + LIST_COLUMNS))
+        for row in rows:
+            print("\t".join("" if v is None else str(v) for v in row))
+    return 0
+
+def cmd_archive(repo, args):
+    """Move students to the archive by status or id"""
+    archived = repo.archive_students(statuses=args.status or ARCHIVE_STATUSES,
+                                     student_ids=args.ids or None,
+                                     report=None if args.quiet else print_progress)
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"Archived {archived} students ({repo.count_archived()} in the archive)")
+    return 0
+
+def cmd_restore(repo, args):
+    """Move archived students back"""
+    restored = repo.restore_students(args.ids)
+    print(f"Restored {restored} students")
+    return 0 if restored == len(set(args.ids)) else 1
+
+def find_course(repo, code):
+    """Return the course with a code or exit with an error"""
+    course = repo.courses.get_course(course_code=code)
+    if course is None:
+        raise SystemExit(f"No course with code {code}")
+    return course
+
+def cmd_courses(repo, args):
+    """List courses, or add one"""
+    if args.add:
+        code, name = args.add
+        repo.courses.add_course(code, name, credits=args.credits, instructor=args.instructor)
+        print(f"Added course {code}")
+        return 0
+
+    print("Code\tName\tCredits\tInstructor\tEnrolled")
+    for _, code, name, credits, instructor, enrolled in repo.courses.list_courses():
+        print(f"{code}\t{name}\t{credits}\t{instructor or ''}\t{enrolled}")
+    return 0
+
+def cmd_enroll(repo, args):
+    """Bulk-enroll students in a course"""
+    course = find_course(repo, args.course)
+    if args.ids_file:
+        with open(args.ids_file, encoding='utf-8') as f:
+            lines = [line.strip() for line in f if line.strip()]
+        ids = [i for i in map(parse_student_id, lines) if i is not None]
+        if len(ids) < len(lines):
+            print(f"Skipped {len(lines) - len(ids)} lines that are not student ids", file=sys.stderr)
+        added = repo.courses.bulk_enroll(course['course_id'], student_ids=ids)
+    else:
+        added = repo.courses.bulk_enroll(course['course_id'], student_status=args.status)
+    print(f"Enrolled {added} students in {args.course}")
+    return 0
+
+def cmd_grades(repo, args):
+    """Post grades for a course from a CSV file"""
+    course = find_course(repo, args.course)
+    updated, unmatched, invalid = repo.courses.bulk_post_grades(course['course_id'], args.file)
+    print(f"Posted {updated} grades, {unmatched} rows did not match an enrollment, "
+          f"{invalid} rows had an unknown grade")
+    return 1 if unmatched or invalid else 0
+
+def cmd_gpa(repo, args):
+    """Print a student's GPA and credits"""
+    gpa, attempted, earned = repo.courses.student_gpa(args.student_id)
+    print(f"GPA: {'n/a' if gpa is None else f'{gpa:.2f}'}  "
+          f"Credits attempted: {attempted}  Credits earned: {earned}")
+    return 0
+
+def build_parser():
+    """Build the argument parser"""
+    parser = argparse.ArgumentParser(prog="python -m student_management",
+                                     description="Student Management System command line")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH,
+                        help=f"database file (default: {DEFAULT_DB_PATH})")
+    parser.add_argument('--campus', action='append', metavar='NAME=PATH',
+                        help="search or report across campus databases (repeat for each)")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="write statement timings and slow query plans to a JSON file")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('import', help="import students from a CSV file")
+    p.add_argument('file')
+    p.add_argument('--update', action='store_true',
+                   help="update students whose email already exists instead of skipping them")
+    p.add_argument('--workers', type=int,
+                   help="processes used to parse large files (default: CPU count)")
+    p.add_argument('--check-duplicates', action='store_true',
+                   help="list rows that probably repeat a student already on file")
+    p.add_argument('-q', '--quiet', action='store_true', help="do not show progress")
+    p.set_defaults(func=cmd_import)
+
+    p = commands.add_parser('export', help="export students (.csv, .jsonl, optionally .gz)")
+    p.add_argument('file')
+    p.add_argument('-q', '--quiet', action='store_true', help="do not show progress")
+    p.set_defaults(func=cmd_export)
+
+    p = commands.add_parser('changes', help="export rows changed since a checkpoint as JSON Lines")
+    p.add_argument('file', nargs='?')
+    p.add_argument('--since', type=int, metavar='SEQ', help="export changes after this seq")
+    p.add_argument('--feed', help="named feed: start at its checkpoint and move it forward")
+    p.add_argument('--list', action='store_true', help="list feeds and their checkpoints")
+    p.add_argument('--prune', action='store_true',
+                   help="delete change log entries every feed has exported")
+    p.add_argument('-q', '--quiet', action='store_true', help="do not show progress")
+    p.set_defaults(func=cmd_changes)
+
+    p = commands.add_parser('duplicates', help="list likely duplicate students")
+    p.add_argument('--threshold', type=float, help="minimum score from 0 to 1 (default: 0.8)")
+    p.add_argument('--output', metavar='FILE', help="write the pairs to a CSV file")
+    p.add_argument('-q', '--quiet', action='store_true', help="do not show progress")
+    p.set_defaults(func=cmd_duplicates)
+
+    p = commands.add_parser('report', help="write the text report")
+    p.add_argument('file')
+    p.add_argument('--summary-only', action='store_true', help="leave out the student list")
+    p.add_argument('--no-cache', action='store_true', help="recompute the cached aggregates")
+    p.set_defaults(func=cmd_report, campus_func=campus_report)
+
+    p = commands.add_parser('search', help="search students by name, email or phone")
+    p.add_argument('term')
+    p.add_argument('--limit', type=int, default=50)
+    p.add_argument('--json', action='store_true', help="print JSON Lines")
+    p.add_argument('--archived', action='store_true', help="also search archived students")
+    p.set_defaults(func=cmd_search, campus_func=campus_search)
+
+    p = commands.add_parser('archive', help="move students and their enrollments to the archive")
+    group = p.add_mutually_exclusive_group()
+    group.add_argument('--status', action='append', choices=STUDENT_STATUSES,
+                       help="status to archive, repeatable (default: Graduated and Inactive)")
+    group.add_argument('--ids', type=int, nargs='+', metavar='ID', help="archive these students")
+    p.add_argument('-q', '--quiet', action='store_true', help="do not show progress")
+    p.set_defaults(func=cmd_archive)
+
+    p = commands.add_parser('restore', help="move archived students back")
+    p.add_argument('ids', type=int, nargs='+', metavar='ID')
+    p.set_defaults(func=cmd_restore)
+
+    p = commands.add_parser('courses', help="list courses or add one")
+    p.add_argument('--add', nargs=2, metavar=('CODE', 'NAME'))
+    p.add_argument('--credits', type=int, default=3)
+    p.add_argument('--instructor')
+    p.set_defaults(func=cmd_courses)
+
+    p = commands.add_parser('enroll', help="bulk-enroll students in a course")
+    p.add_argument('course', help="course code")
+    group = p.add_mutually_exclusive_group(required=True)
+    group.add_argument('--status', help="enroll every student with this status")
+    group.add_argument('--ids-file', help="file with one student id per line")
+    p.set_defaults(func=cmd_enroll)
+
+    p = commands.add_parser('grades', help="post grades from a CSV (Student ID or Email, Grade)")
+    p.add_argument('course', help="course code")
+    p.add_argument('file')
+    p.set_defaults(func=cmd_grades)
+
+    p = commands.add_parser('gpa', help="show a student's GPA")
+    p.add_argument('student_id', type=int)
+    p.set_defaults(func=cmd_gpa)
+
+    return parser
+
+def main(argv=None):
+    """Run the command line"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    instrumentation = Instrumentation() if args.profile else None
+    if args.campus:
+        func = getattr(args, 'campus_func', None)
+        if func is None:
+            parser.error(f"{args.command} works on a single database; use --db")
+        # Imported here: only campus queries need the thread pool
+        from .federation import CampusFederation, parse_campuses
+        try:
+            # Search and report only read: no writer threads, no migrations,
+            # and a mistyped path is an error instead of a new empty database
+            repo = CampusFederation(parse_campuses(args.campus), read_only=True,
+                                    instrumentation=instrumentation)
+        except (ValueError, FileNotFoundError, sqlite3.DatabaseError) as e:
+            parser.error(str(e))
+    else:
+        func = args.func
+        repo = StudentRepository(args.db, instrumentation=instrumentation)
+    try:
+        with instrumentation.timed(f'cli.{args.command}') if instrumentation else nullcontext():
+            return func(repo, args)
+    finally:
+        repo.close()
+        if instrumentation:
+            instrumentation.export_json(args.profile)
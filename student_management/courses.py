@@ -0,0 +1,271 @@
+"""Courses, enrollments and grades
+
+Bulk operations run as a handful of set-based statements inside one
+transaction: the incoming ids or grades are loaded into a temp table and
+joined against students/enrollments, instead of issuing one statement per
+student. Writes run as jobs on the repository's Writer; reads use the
+shared read connection.
+"""
+
+import csv
+
+ENROLLMENT_STATUSES = ('Enrolled', 'Dropped', 'Completed')
+GRADE_BATCH_SIZE = 5000
+
+def parse_student_id(value):
+    """Return value as a student id, or None if it is not a whole number"""
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        return None
+
+class CourseRepository:
+    """Course and enrollment access on a shared read connection and writer"""
+
+    def __init__(self, conn, writer):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.writer = writer
+
+    def add_course(self, course_code, course_name, credits=3, instructor=None, description=None):
+        """Insert a course and return the new course_id"""
+        def work(conn):
+            cursor = conn.execute("""
+                INSERT INTO courses (course_code, course_name, credits, instructor, description)
+                VALUES (?, ?, ?, ?, ?)
+            """, (course_code, course_name, credits, instructor, description))
+            conn.commit()
+            return cursor.lastrowid
+
+        return self.writer.run(work)
+
+    def update_course(self, course_id, course_code, course_name, credits=3,
+                      instructor=None, description=None):
+        """Replace every editable field of a course"""
+        def work(conn):
+            conn.execute("""
+                UPDATE courses
+                SET course_code=?, course_name=?, credits=?, instructor=?, description=?
+                WHERE course_id=?
+            """, (course_code, course_name, credits, instructor, description, course_id))
+            conn.commit()
+
+        self.writer.run(work)
+
+    def delete_course(self, course_id):
+        """Delete a course and its enrollments, archived ones included"""
+        def work(conn):
+            with conn:
+                conn.execute("DELETE FROM enrollments WHERE course_id=?", (course_id,))
+                conn.execute("DELETE FROM archived_enrollments WHERE course_id=?", (course_id,))
+                conn.execute("DELETE FROM courses WHERE course_id=?", (course_id,))
+
+        self.writer.run(work)
+
+    def get_course(self, course_id=None, course_code=None):
+        """Return a course by id or code as a dict, or None"""
+        if course_id is not None:
+            self.cursor.execute("SELECT * FROM courses WHERE course_id=?", (course_id,))
+        else:
+            self.cursor.execute("SELECT * FROM courses WHERE course_code=?", (course_code,))
+        row = self.cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([d[0] for d in self.cursor.description], row))
+
+    def list_courses(self):
+        """Return every course with its active enrollment count"""
+        self.cursor.execute("""
+            SELECT c.course_id, c.course_code, c.course_name, c.credits, c.instructor,
+                   COUNT(e.enrollment_id)
+            FROM courses c
+            LEFT JOIN enrollments e ON e.course_id = c.course_id AND e.status != 'Dropped'
+            GROUP BY c.course_id ORDER BY c.course_code
+        """)
+        return self.cursor.fetchall()
+
+    def enroll_student(self, student_id, course_id):
+        """Enroll one student; returns False if already enrolled
+
+        Raises ValueError if the student or the course does not exist.
+        """
+        def work(conn):
+            for table, key, value in (('students', 'student_id', student_id),
+                                      ('courses', 'course_id', course_id)):
+                if conn.execute(f"SELECT 1 FROM {table} WHERE {key}=?", (value,)).fetchone() is None:
+                    raise ValueError(f"No {table[:-1]} with id {value}")
+            with conn:
+                return conn.execute("""
+                    INSERT INTO enrollments (student_id, course_id)
+                    SELECT ?, ? WHERE NOT EXISTS (
+                        SELECT 1 FROM enrollments
+                        WHERE student_id = ? AND course_id = ? AND status != 'Dropped')
+                """, (student_id, course_id, student_id, course_id)).rowcount == 1
+
+        return self.writer.run(work)
+
+    def drop_enrollment(self, student_id, course_id):
+        """Mark a student's enrollment in a course as dropped"""
+        def work(conn):
+            cursor = conn.execute("""
+                UPDATE enrollments SET status='Dropped'
+                WHERE student_id=? AND course_id=? AND status='Enrolled'
+            """, (student_id, course_id))
+            conn.commit()
+            return cursor.rowcount
+
+        return self.writer.run(work)
+
+    def bulk_enroll(self, course_id, student_ids=None, student_status=None):
+        """Enroll many students in a course with one INSERT ... SELECT
+
+        Students are given either as an iterable of ids or by student
+        status (for example every 'Active' student). Unknown or malformed
+        ids and students already enrolled in the course are skipped.
+        Returns the number of new enrollments.
+        """
+        if student_ids is None and student_status is None:
+            raise ValueError("Give student_ids or student_status")
+
+        not_enrolled = """
+            NOT EXISTS (SELECT 1 FROM enrollments e
+                        WHERE e.course_id = ? AND e.student_id = s.student_id
+                          AND e.status != 'Dropped')
+        """
+
+        def work(conn):
+            with conn:
+                if student_ids is None:
+                    return conn.execute(f"""
+                        INSERT INTO enrollments (student_id, course_id)
+                        SELECT s.student_id, ? FROM students s
+                        WHERE s.status = ? AND {not_enrolled}
+                    """, (course_id, student_status, course_id)).rowcount
+
+                self.load_bulk_ids(conn, student_ids)
+                return conn.execute(f"""
+                    INSERT INTO enrollments (student_id, course_id)
+                    SELECT s.student_id, ? FROM temp.bulk_ids b
+                    JOIN students s ON s.student_id = b.student_id
+                    WHERE {not_enrolled}
+                """, (course_id, course_id)).rowcount
+
+        return self.writer.run(work)
+
+    @staticmethod
+    def load_bulk_ids(conn, student_ids):
+        """Fill the connection's temp.bulk_ids table"""
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS bulk_ids (student_id INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM temp.bulk_ids")
+        ids = (parse_student_id(i) for i in student_ids)
+        conn.executemany("INSERT OR IGNORE INTO temp.bulk_ids VALUES (?)",
+                         ((i,) for i in ids if i is not None))
+
+    def bulk_post_grades(self, course_id, filename):
+        """Post grades for a course from a CSV file in one transaction
+
+        The file needs a Grade column and either a Student ID or an Email
+        column. Rows are staged in a temp table and applied with a single
+        UPDATE ... FROM; matched enrollments become Completed, and when a
+        student appears more than once the last valid row wins. Grades
+        that are not in grade_points are set aside. Returns (updated,
+        unmatched, invalid): the enrollments graded, the rows that matched
+        no enrollment (malformed Student IDs included) and the rows with
+        an unknown grade.
+        """
+        def work(conn):
+            cursor = conn.cursor()
+            with conn:
+                cursor.execute("""
+                    CREATE TEMP TABLE IF NOT EXISTS grade_import (
+                        student_id INTEGER, email TEXT, grade TEXT NOT NULL
+                    )
+                """)
+                cursor.execute("DELETE FROM temp.grade_import")
+
+                with open(filename, 'r', newline='', encoding='utf-8') as csvfile:
+                    reader = csv.DictReader(csvfile)
+                    batch = []
+                    for row in reader:
+                        grade = (row.get('Grade') or '').strip().upper()
+                        if not grade:
+                            continue
+                        student_id = (row.get('Student ID') or '').strip()
+                        batch.append((parse_student_id(student_id) if student_id else None,
+                                      (row.get('Email') or '').strip() or None, grade))
+                        if len(batch) >= GRADE_BATCH_SIZE:
+                            cursor.executemany("INSERT INTO temp.grade_import VALUES (?, ?, ?)", batch)
+                            batch.clear()
+                    cursor.executemany("INSERT INTO temp.grade_import VALUES (?, ?, ?)", batch)
+
+                invalid = cursor.execute("""
+                    DELETE FROM temp.grade_import
+                    WHERE grade NOT IN (SELECT grade FROM grade_points)
+                """).rowcount
+
+                cursor.execute("""
+                    UPDATE temp.grade_import SET student_id = (
+                        SELECT s.student_id FROM students s WHERE s.email = grade_import.email)
+                    WHERE student_id IS NULL
+                """)
+                cursor.execute("""
+                    SELECT COUNT(*) FROM temp.grade_import g
+                    WHERE NOT EXISTS (SELECT 1 FROM enrollments e
+                                      WHERE e.course_id = ? AND e.student_id = g.student_id
+                                        AND e.status != 'Dropped')
+                """, (course_id,))
+                unmatched = cursor.fetchone()[0]
+
+                cursor.execute("""
+                    UPDATE enrollments SET grade = g.grade, status = 'Completed'
+                    FROM (SELECT student_id, grade FROM temp.grade_import
+                          WHERE rowid IN (SELECT MAX(rowid) FROM temp.grade_import
+                                          GROUP BY student_id)) g
+                    WHERE enrollments.course_id = ? AND enrollments.student_id = g.student_id
+                      AND enrollments.status != 'Dropped'
+                """, (course_id,))
+                updated = cursor.rowcount
+
+            return updated, unmatched, invalid
+
+        return self.writer.run(work)
+
+    def student_gpa(self, student_id):
+        """Return (gpa, credits_attempted, credits_earned) for a student
+
+        GPA is the credit-weighted mean of graded courses, computed in
+        SQL through the grade_points table. gpa is None with no grades.
+        Credits attempted cover every enrollment not dropped, graded or
+        still in progress; credits earned only passing grades.
+        """
+        self.cursor.execute("""
+            SELECT SUM(gp.points * c.credits) / SUM(CASE WHEN gp.points IS NOT NULL THEN c.credits END),
+                   COALESCE(SUM(c.credits), 0),
+                   COALESCE(SUM(CASE WHEN gp.points > 0 THEN c.credits ELSE 0 END), 0)
+            FROM enrollments e
+            JOIN courses c ON c.course_id = e.course_id
+            LEFT JOIN grade_points gp ON gp.grade = e.grade
+            WHERE e.student_id = ? AND e.status != 'Dropped'
+        """, (student_id,))
+        return self.cursor.fetchone()
+
+    def course_statistics(self, course_id):
+        """Return enrollment and grade aggregates for a course as a dict"""
+        self.cursor.execute("""
+            SELECT COUNT(*),
+                   SUM(e.status = 'Enrolled'),
+                   SUM(e.status = 'Dropped'),
+                   COUNT(gp.points),
+                   AVG(gp.points)
+            FROM enrollments e
+            LEFT JOIN grade_points gp ON gp.grade = e.grade
+            WHERE e.course_id = ?
+        """, (course_id,))
+        row = self.cursor.fetchone()
+        return {
+            'enrollments': row[0],
+            'enrolled': row[1] or 0,
+            'dropped': row[2] or 0,
+            'graded': row[3],
+            'average_points': row[4],
+        }
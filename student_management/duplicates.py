@@ -0,0 +1,277 @@
+"""Duplicate student detection with blocking keys
+
+Comparing every pair of students is quadratic, so each student gets a few
+blocking keys (normalized full name, phone digits, date of birth with a
+name prefix, email local part) stored in match_keys. Only students that
+share a key are scored, which keeps the work close to linear in the
+number of students. Keys of very common values (blocks larger than
+MAX_BLOCK_SIZE) are ignored rather than compared pairwise.
+"""
+
+import re
+import threading
+import unicodedata
+from difflib import SequenceMatcher
+from itertools import chain, groupby
+from operator import itemgetter
+
+from .changes import get_position, log_bounds, save_position
+
+NON_ALNUM = re.compile(r'[^0-9A-Za-z]+')
+DUPLICATE_THRESHOLD = 0.8
+MAX_BLOCK_SIZE = 100
+KEYS_BATCH_SIZE = 5000
+# Name of the match_keys position in log_positions
+KEYS_POSITION = 'duplicate-keys'
+# Rebuild match_keys when more than this fraction of the students changed
+KEYS_REBUILD_FRACTION = 0.25
+MATCH_COLUMNS = 'student_id, first_name, last_name, email, phone, date_of_birth'
+
+def normalize(value):
+    """Casefold and drop accents, spaces and punctuation"""
+    if not value:
+        return ''
+    if value.isascii():
+        return NON_ALNUM.sub('', value).lower()
+    value = unicodedata.normalize('NFKD', value)
+    return ''.join(c for c in value if c.isalnum()).casefold()
+
+def phone_digits(phone):
+    """Return the last ten digits of a phone number, or '' if it has fewer than seven"""
+    digits = ''.join(c for c in phone or '' if c.isdigit())
+    return digits[-10:] if len(digits) >= 7 else ''
+
+def email_local(email):
+    """Return the normalized part of an email address before the @"""
+    return normalize((email or '').partition('@')[0])
+
+def blocking_keys(first_name, last_name, email, phone, date_of_birth):
+    """Return the set of blocking keys of one student"""
+    first, last = normalize(first_name), normalize(last_name)
+    # Separated, so ('ab', 'c') and ('a', 'bc') get different keys
+    keys = {'n:' + '\x1f'.join(sorted((first, last)))}
+    if date_of_birth:
+        keys.add(f'dl:{date_of_birth}:{last[:3]}')
+        keys.add(f'df:{date_of_birth}:{first[:3]}')
+    digits = phone_digits(phone)
+    if digits:
+        keys.add('p:' + digits)
+    local = email_local(email)
+    if len(local) >= 4:
+        keys.add('e:' + local)
+    return keys
+
+def similarity(a, b):
+    """Ratio of matching characters between two normalized strings"""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    return SequenceMatcher(None, a, b).ratio()
+
+def prepare(first_name, last_name, email, phone, date_of_birth):
+    """Return the normalized fields score_pair compares
+
+    (first, last, email local part, phone digits, date of birth, email).
+    """
+    return (normalize(first_name), normalize(last_name), email_local(email),
+            phone_digits(phone), date_of_birth or '', (email or '').casefold())
+
+def score_pair(a, b, threshold=0.0):
+    """Score how likely two prepared records are one student, from 0 to 1
+
+    Names weigh half (either order, so swapped first and last names still
+    match), date of birth and phone a fifth each and the email local part
+    a tenth. A field missing on either side counts as half a match. Pairs
+    that cannot reach threshold given their date of birth and phone score
+    0 without the costly fuzzy name comparison, which is most pairs in a
+    block.
+    """
+    if a[4] and b[4]:
+        dob = 1.0 if a[4] == b[4] else 0.0
+    else:
+        dob = 0.5
+    if a[3] and b[3]:
+        phone = 1.0 if a[3] == b[3] else 0.0
+    else:
+        phone = 0.5
+    score = 0.2 * dob + 0.2 * phone
+    # Name similarity needed to reach threshold even if the email parts match
+    needed = (threshold - score - 0.1) / 0.5 - 1e-9
+    if needed > 1:
+        return 0.0
+    if needed > 1 - 1e-6:
+        if (a[0], a[1]) != (b[0], b[1]) and (a[0], a[1]) != (b[1], b[0]):
+            return 0.0
+
+    name = max(similarity(a[0], b[0]) + similarity(a[1], b[1]),
+               similarity(a[0], b[1]) + similarity(a[1], b[0])) / 2
+    return round(score + 0.5 * name + 0.1 * similarity(a[2], b[2]), 3)
+
+def insert_keys(conn, rows):
+    """Add the match keys of (student_id, first, last, email, phone, dob) rows"""
+    conn.executemany("INSERT OR IGNORE INTO match_keys (key, student_id) VALUES (?, ?)",
+                     [(key, row[0]) for row in rows for key in blocking_keys(*row[1:])])
+
+def refresh_keys(conn):
+    """Bring match_keys up to date with students on the writer connection
+
+    Students changed since the last refresh (per change_log) get their
+    keys recomputed; the table is rebuilt on the first run, after a large
+    share of the roster changed, or when the log entries were pruned.
+    Returns the number of students whose keys were written.
+    """
+    cursor = conn.cursor()
+    seq = get_position(cursor, KEYS_POSITION)
+    oldest, upto = log_bounds(cursor)
+    if seq == upto:
+        return 0
+
+    changed = None
+    if seq is not None and not (oldest is not None and oldest > seq + 1):
+        cursor.execute("""
+            SELECT DISTINCT row_id FROM change_log WHERE seq > ? AND seq <= ? AND table_name = 'students'
+        """, (seq, upto))
+        changed = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT COUNT(*) FROM students")
+        if len(changed) > KEYS_REBUILD_FRACTION * max(cursor.fetchone()[0], 1000):
+            changed = None
+
+    written = 0
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if changed is None:
+            conn.execute("DELETE FROM match_keys")
+            cursor.execute(f"SELECT {MATCH_COLUMNS} FROM students")
+            while True:
+                rows = cursor.fetchmany(KEYS_BATCH_SIZE)
+                if not rows:
+                    break
+                insert_keys(conn, rows)
+                written += len(rows)
+        else:
+            for start in range(0, len(changed), 500):
+                chunk = changed[start:start + 500]
+                ids = ','.join('?' * len(chunk))
+                conn.execute(f"DELETE FROM match_keys WHERE student_id IN ({ids})", chunk)
+                cursor.execute(f"SELECT {MATCH_COLUMNS} FROM students WHERE student_id IN ({ids})", chunk)
+                rows = cursor.fetchall()
+                insert_keys(conn, rows)
+                written += len(rows)
+        save_position(conn, KEYS_POSITION, upto)
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    return written
+
+def load_records(cursor, student_ids, records):
+    """Add the prepared fields of any students not yet in records, keyed by id"""
+    missing = [i for i in student_ids if i not in records]
+    for start in range(0, len(missing), 500):
+        chunk = missing[start:start + 500]
+        cursor.execute(f"""
+            SELECT {MATCH_COLUMNS} FROM students WHERE student_id IN ({",".join("?" * len(chunk))})
+        """, chunk)
+        for row in cursor.fetchall():
+            records[row[0]] = prepare(*row[1:])
+
+def find_duplicates(conn, threshold=DUPLICATE_THRESHOLD, report=None, cancelled=None):
+    """Return (score, id, other_id) for every likely duplicate pair, best first
+
+    match_keys must be current (see refresh_keys). One pass over the key
+    index in key order yields the blocks; the students of a batch of
+    blocks are loaded together and every pair inside a block is scored.
+    A pair sharing several keys is reported once. Returns None if
+    cancelled.
+    """
+    report = report or (lambda fraction, message: None)
+    cancelled = cancelled or threading.Event()
+
+    cursor = conn.cursor()
+    # One read transaction, so the keys and the records agree
+    cursor.execute("BEGIN")
+    cursor.execute("SELECT COUNT(*) FROM match_keys")
+    total = cursor.fetchone()[0] or 1
+
+    keys = conn.cursor()
+    keys.execute("SELECT key, student_id FROM match_keys ORDER BY key")
+    rows = chain.from_iterable(iter(lambda: keys.fetchmany(KEYS_BATCH_SIZE), []))
+
+    found = {}
+    blocks = []
+    members = 0
+    seen = 0
+
+    def score_blocks():
+        records = {}
+        load_records(cursor, {i for ids in blocks for i in ids}, records)
+        for ids in blocks:
+            ids = [i for i in ids if i in records]
+            for n, a in enumerate(ids):
+                for b in ids[n + 1:]:
+                    score = score_pair(records[a], records[b], threshold)
+                    if score >= threshold:
+                        found[(a, b)] = score
+        report(seen / total, f"Found {len(found)} likely duplicates...")
+
+    for _, group in groupby(rows, key=itemgetter(0)):
+        ids = [row[1] for row in group]
+        seen += len(ids)
+        if 2 <= len(ids) <= MAX_BLOCK_SIZE:
+            blocks.append(ids)
+            members += len(ids)
+        if members >= KEYS_BATCH_SIZE:
+            if cancelled.is_set():
+                break
+            score_blocks()
+            blocks = []
+            members = 0
+    if blocks and not cancelled.is_set():
+        score_blocks()
+    keys.close()
+    conn.rollback()
+
+    if cancelled.is_set():
+        return None
+    return sorted(((score, a, b) for (a, b), score in found.items()),
+                  key=lambda pair: (-pair[0], pair[1], pair[2]))
+
+def match_rows(conn, rows, threshold=DUPLICATE_THRESHOLD):
+    """Find existing students that incoming import rows probably duplicate
+
+    rows are importer tuples (first, last, email, phone, dob, address,
+    status). Returns (index, score, student_id) with the best match of
+    each row that scored at least threshold. A student with the row's own
+    email is the same record, not a duplicate, and is skipped.
+    """
+    cursor = conn.cursor()
+    row_keys = [blocking_keys(*row[:5]) for row in rows]
+    wanted = list({key for keys in row_keys for key in keys})
+    blocks = {}
+    for start in range(0, len(wanted), 500):
+        chunk = wanted[start:start + 500]
+        cursor.execute(f"""
+            SELECT key, student_id FROM match_keys WHERE key IN ({",".join("?" * len(chunk))})
+        """, chunk)
+        for key, student_id in cursor.fetchall():
+            blocks.setdefault(key, []).append(student_id)
+
+    records = {}
+    load_records(cursor, {i for ids in blocks.values() if len(ids) <= MAX_BLOCK_SIZE for i in ids},
+                 records)
+    matches = []
+    for index, (row, keys) in enumerate(zip(rows, row_keys)):
+        incoming = prepare(*row[:5])
+        best = None
+        candidates = {i for key in keys for i in blocks.get(key, ()) if i in records}
+        for student_id in candidates:
+            record = records[student_id]
+            if record[5] == incoming[5]:
+                continue
+            score = score_pair(incoming, record, threshold)
+            if score >= threshold and (best is None or score > best[1]):
+                best = (index, score, student_id)
+        if best is not None:
+            matches.append(best)
+    return matches
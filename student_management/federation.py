@@ -0,0 +1,196 @@
+"""Several campus databases queried as one
+
+Each campus keeps its own database file behind its own StudentRepository
+(writer thread and reader pool). Reads fan out to every campus at once on
+pooled connections, and the per-campus results are merged in (last_name,
+first_name) order, or by relevance for a search. Writes go to the campus
+that owns the student. Student ids are only unique within a campus, so
+students are identified by (campus, student_id).
+"""
+
+import heapq
+import os
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from . import reports
+from .repository import StudentRepository
+
+# Larger than any student_id, for keyset seeks past every row with a given name
+MAX_STUDENT_ID = 2 ** 63 - 1
+# The report student line, followed by the campus of the student
+CAMPUS_STUDENT_LINE = reports.STUDENT_LINE[:-1] + " [{4}]\n"
+
+def parse_campuses(specs):
+    """Turn NAME=PATH (or bare PATH, named after the file) strings into a dict"""
+    campuses = {}
+    for spec in specs:
+        name, separator, path = spec.partition('=')
+        if not separator:
+            name, path = os.path.splitext(os.path.basename(spec))[0], spec
+        if name in campuses:
+            raise ValueError(f"Campus {name} is given twice")
+        campuses[name] = path
+    return campuses
+
+class CampusFederation:
+    """Campus databases behind one read and write interface
+
+    campuses maps campus names to database paths. List rows are the
+    repository list rows with the campus name in front: (campus,
+    student_id, first_name, last_name, email, phone, status).
+    """
+
+    def __init__(self, campuses, read_only=False, instrumentation=None):
+        self.campuses = {}
+        try:
+            for name, path in campuses.items():
+                self.campuses[name] = StudentRepository(path, read_only, instrumentation)
+        except BaseException:
+            self.close()
+            raise
+        self.executor = ThreadPoolExecutor(max_workers=len(self.campuses) or 1,
+                                           thread_name_prefix="campus")
+
+    def close(self):
+        """Close every campus repository"""
+        if getattr(self, 'executor', None) is not None:
+            self.executor.shutdown()
+        for repo in self.campuses.values():
+            repo.close()
+
+    def repo(self, campus):
+        """Return the repository of a campus"""
+        try:
+            return self.campuses[campus]
+        except KeyError:
+            raise ValueError(f"Unknown campus {campus}") from None
+
+    def fan_out(self, func):
+        """Run func(campus, repo, conn) for every campus at once
+
+        Each call gets a pooled read connection of its campus; SQLite
+        releases the GIL while it works, so the campuses really run in
+        parallel. Returns {campus: result} in campus order.
+        """
+        def run(campus, repo):
+            with repo.readers.connection() as conn:
+                return func(campus, repo, conn)
+
+        futures = {name: self.executor.submit(run, name, repo) for name, repo in self.campuses.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    @staticmethod
+    def list_key(row):
+        """Return the merge and keyset key of a federated list row"""
+        return (row[3], row[2], row[0], row[1])
+
+    def campus_counts(self, search_term=""):
+        """Return {campus: number of students matching search_term}"""
+        def count(campus, repo, conn):
+            return repo.count_students(*repo.build_search_filter(search_term), conn=conn)
+        return self.fan_out(count)
+
+    def count_students(self, search_term=""):
+        """Count the students matching search_term on every campus"""
+        return sum(self.campus_counts(search_term).values())
+
+    def fetch_student_page(self, limit, search_term="", after=None):
+        """Return up to limit list rows from all campuses in name order
+
+        after is the list_key of the last row of the previous page; each
+        campus seeks past it on idx_students_name and returns at most
+        limit rows, so a page costs limit rows per campus whatever the
+        page number.
+        """
+        def fetch(campus, repo, conn):
+            key = None
+            if after is not None:
+                last_name, first_name, after_campus, student_id = after
+                if campus < after_campus:
+                    student_id = MAX_STUDENT_ID
+                elif campus > after_campus:
+                    student_id = -1
+                key = (last_name, first_name, student_id)
+            where, params = repo.build_search_filter(search_term)
+            rows = repo.fetch_student_page(limit, where, params, after=key, conn=conn)
+            return [(campus,) + row for row in rows]
+
+        pages = self.fan_out(fetch)
+        return list(heapq.merge(*pages.values(), key=self.list_key))[:limit]
+
+    def search_students(self, search_term, limit=50):
+        """Return the best limit matches from all campuses, most relevant first
+
+        Each campus ranks its own matches and the lists are merged on the
+        bm25 score, then by name. bm25 weighs a word by how rare it is in
+        each campus, so scores from different campuses are close to, not
+        exactly, comparable.
+        """
+        def search(campus, repo, conn):
+            rows = repo.search_table('students', search_term, limit, conn=conn, scored=True)
+            return [(row[-1], campus) + row[:-1] for row in rows]
+
+        results = self.fan_out(search)
+        ranked = heapq.merge(*results.values(),
+                             key=lambda row: (row[0], row[4], row[3], row[1], row[2]))
+        return [row[1:] for row in islice(ranked, limit)]
+
+    def report_summary(self, use_cache=True):
+        """Return the report aggregates of all campuses combined"""
+        summaries = self.fan_out(
+            lambda campus, repo, conn: reports.report_summary(conn, use_cache, repo.store_summary))
+        return reports.merge_summaries(summaries.values())
+
+    def write_report(self, filename, details=True, use_cache=True, report=None, cancelled=None):
+        """Write one text report over every campus
+
+        The campus summaries are computed in parallel and merged; the
+        student list streams every campus in name order through a merge,
+        with one pooled connection per campus, and gives the campus of
+        each student. Returns the merged summary, or None if cancelled.
+        """
+        def campus_rows(campus, cursor):
+            for row in reports.student_rows(cursor):
+                yield row + (campus,)
+
+        summary = self.report_summary(use_cache)
+        with ExitStack() as stack:
+            rows = None
+            if details:
+                streams = []
+                for campus, repo in self.campuses.items():
+                    cursor = stack.enter_context(repo.readers.connection()).cursor()
+                    stack.callback(cursor.close)
+                    streams.append(campus_rows(campus, cursor))
+                rows = heapq.merge(*streams, key=lambda row: (row[1], row[0]))
+            return reports.write_report_file(filename, summary, rows, report, cancelled,
+                                             line=CAMPUS_STUDENT_LINE)
+
+    def add_student(self, campus, *args, **kwargs):
+        """Add a student to a campus and return its (campus, student_id)"""
+        return campus, self.repo(campus).add_student(*args, **kwargs)
+
+    def update_student(self, key, *args, **kwargs):
+        """Update the student identified by (campus, student_id)"""
+        campus, student_id = key
+        self.repo(campus).update_student(student_id, *args, **kwargs)
+
+    def delete_student(self, key):
+        """Delete the student identified by (campus, student_id)"""
+        campus, student_id = key
+        self.repo(campus).delete_student(student_id)
+
+    def archive_student(self, key):
+        """Archive the student identified by (campus, student_id)"""
+        campus, student_id = key
+        return self.repo(campus).archive_student(student_id)
+
+    def get_student(self, key):
+        """Return a student as a dict with its campus, or None"""
+        campus, student_id = key
+        student = self.repo(campus).get_student(student_id)
+        if student is not None:
+            student['campus'] = campus
+        return student
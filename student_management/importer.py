@@ -0,0 +1,253 @@
+"""Parallel CSV import: byte-range shards parsed in worker processes
+
+The input is cut into shards at record boundaries found by the csv
+module itself, so a shard never starts inside a record. Worker processes
+decode, parse and validate their shards with check_student and send back
+clean rows and rejected lines; the calling thread, which owns the write
+connection, inserts the clean rows in file order. Small files are parsed
+in-process with the same code.
+"""
+
+import csv
+import io
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from . import duplicates
+from .reports import STUDENT_STATUSES
+from .validation import check_student
+
+IMPORT_BATCH_SIZE = 5000
+SHARD_BYTES = 4 * 1024 * 1024
+PARALLEL_MIN_BYTES = 2 * SHARD_BYTES
+CSV_FIELDS = ('First Name', 'Last Name', 'Email', 'Phone', 'Date of Birth', 'Address', 'Status')
+STATUS_NAMES = {status.lower(): status for status in STUDENT_STATUSES}
+
+def read_header(filename):
+    """Return the CSV header fields and the byte offset where the data starts"""
+    with open(filename, 'rb') as f:
+        line = f.readline()
+    return next(csv.reader([line.decode('utf-8')]), []), len(line)
+
+def shard_ranges(filename, data_start, shard_bytes=SHARD_BYTES):
+    """Yield (start, end) byte ranges of about shard_bytes over the CSV data
+
+    The file is fed to csv.reader one line at a time while the bytes are
+    counted, so every boundary falls where the parser finished a record:
+    quoted fields with newlines, and stray quotes in unquoted fields, are
+    never cut in two. Scanning is much cheaper than parsing and checking
+    the rows, and ranges are yielded as they are found, so the workers
+    start on the first shards while the rest of the file is scanned.
+    """
+    size = os.path.getsize(filename)
+    start = end = data_start
+    with open(filename, 'rb') as f:
+        f.seek(data_start)
+
+        def lines():
+            nonlocal end
+            for line in f:
+                end += len(line)
+                yield line.decode('utf-8')
+
+        try:
+            for _ in csv.reader(lines()):
+                if end - start >= shard_bytes:
+                    yield start, end
+                    start = end
+        except csv.Error:
+            # Malformed tail: leave it to one shard, whose parse reports the error
+            end = size
+    if end > start:
+        yield start, end
+
+def parse_shard(filename, start, end, fieldnames):
+    """Parse and validate one byte range of a CSV file
+
+    Returns (rows, rejected, lines): insert-ready tuples, rejected entries
+    as [line, *raw fields, error] with the first line of the record
+    counted from the start of the shard, and the number of physical lines
+    in the shard.
+    """
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+
+    index = {name: i for i, name in enumerate(fieldnames)}
+    columns = [index.get(name) for name in CSV_FIELDS]
+    rows = []
+    rejected = []
+    reader = csv.reader(io.StringIO(text, newline=''))
+    next_line = 1
+    for raw in reader:
+        # A quoted field may span lines; report the line the record starts on
+        first_line, next_line = next_line, reader.line_num + 1
+        if not raw:
+            continue
+        first, last, email, phone, dob, address, status = (
+            raw[i].strip() if i is not None and i < len(raw) else '' for i in columns)
+        status = STATUS_NAMES.get(status.lower(), status) if status else 'Active'
+
+        error = check_student(first, last, email, dob, status)
+        if error:
+            rejected.append([first_line] + raw + [error])
+            continue
+        rows.append((first, last, email, phone, dob or None, address, status))
+    return rows, rejected, reader.line_num
+
+def import_csv(conn, filename, upsert=False, report=None, cancelled=None, workers=None,
+               check_duplicates=False):
+    """Import a students CSV file on conn in one transaction
+
+    Files larger than PARALLEL_MIN_BYTES are parsed by up to workers
+    processes (default: CPU count); at most two shards per worker are in
+    flight so memory stays bounded while the inserts catch up. Rejected
+    lines are written to a *_rejected.csv file next to the input. With
+    check_duplicates, each batch is matched against the students already
+    on file (see duplicates.match_rows) and likely duplicates are listed
+    in a *_duplicates.csv file; they are still imported. Both files are
+    removed if the import is cancelled or fails, since nothing of it is
+    kept. Returns the same summary dict as StudentRepository.import_students.
+    """
+    report = report or (lambda fraction, message: None)
+    cancelled = cancelled or threading.Event()
+
+    if upsert:
+        conflict = """
+            ON CONFLICT(email) DO UPDATE SET
+                first_name=excluded.first_name, last_name=excluded.last_name,
+                phone=excluded.phone, date_of_birth=excluded.date_of_birth,
+                address=excluded.address, status=excluded.status
+        """
+    else:
+        conflict = "ON CONFLICT(email) DO NOTHING"
+    sql = f"""
+        INSERT INTO students (first_name, last_name, email, phone,
+                              date_of_birth, address, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        {conflict}
+    """
+
+    summary = {'imported': 0, 'skipped': 0, 'rejected': 0, 'rejected_file': None,
+               'duplicates': 0, 'duplicates_file': None, 'cancelled': False}
+    fieldnames, data_start = read_header(filename)
+    size = os.path.getsize(filename)
+    total_bytes = size or 1
+    if size >= PARALLEL_MIN_BYTES:
+        ranges = shard_ranges(filename, data_start)
+        shard_count = -(-(size - data_start) // SHARD_BYTES)
+    else:
+        ranges = [(data_start, size)]
+        shard_count = 1
+    workers = min(workers or os.cpu_count() or 1, shard_count)
+    parallel = workers > 1
+
+    rejected_handle = None
+    duplicates_handle = None
+    executor = None
+    committed = False
+    line = 1
+    cache_size = conn.execute("PRAGMA cache_size").fetchone()[0]
+    try:
+        conn.execute("PRAGMA cache_size = -65536")
+        if check_duplicates:
+            report(0.0, "Indexing existing students...")
+            duplicates.refresh_keys(conn)
+        conn.execute("BEGIN IMMEDIATE")
+
+        if parallel:
+            # spawn: forking would copy the GUI and writer threads' locks
+            executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+            pending = deque()
+            shards = iter(ranges)
+
+            def results():
+                while True:
+                    while len(pending) < 2 * workers:
+                        shard = next(shards, None)
+                        if shard is None:
+                            break
+                        pending.append((shard, executor.submit(parse_shard, filename,
+                                                               shard[0], shard[1], fieldnames)))
+                    if not pending:
+                        return
+                    shard, future = pending.popleft()
+                    yield shard, future.result()
+        else:
+            def results():
+                for shard in ranges:
+                    yield shard, parse_shard(filename, shard[0], shard[1], fieldnames)
+
+        for (start, end), (rows, rejected, lines) in results():
+            if cancelled.is_set():
+                break
+
+            for batch_start in range(0, len(rows), IMPORT_BATCH_SIZE):
+                if cancelled.is_set():
+                    break
+                batch = rows[batch_start:batch_start + IMPORT_BATCH_SIZE]
+                if check_duplicates:
+                    # Before the insert, so rows are only compared with students already on file
+                    matches = duplicates.match_rows(conn, batch)
+                    if matches:
+                        if duplicates_handle is None:
+                            summary['duplicates_file'] = os.path.splitext(filename)[0] + '_duplicates.csv'
+                            duplicates_handle = open(summary['duplicates_file'], 'w', newline='',
+                                                     encoding='utf-8')
+                            duplicates_writer = csv.writer(duplicates_handle)
+                            duplicates_writer.writerow(['Score', 'First Name', 'Last Name', 'Email',
+                                                        'Phone', 'Date of Birth', 'Match ID'])
+                        duplicates_writer.writerows([score, *batch[index][:5], student_id]
+                                                    for index, score, student_id in matches)
+                        summary['duplicates'] += len(matches)
+                cursor = conn.executemany(sql, batch)
+                summary['imported'] += cursor.rowcount
+                if not upsert:
+                    summary['skipped'] += len(batch) - cursor.rowcount
+                done = start + (end - start) * (batch_start + len(batch)) // len(rows)
+                report(done / total_bytes, f"Imported {summary['imported']} students...")
+
+            if rejected:
+                if rejected_handle is None:
+                    summary['rejected_file'] = os.path.splitext(filename)[0] + '_rejected.csv'
+                    rejected_handle = open(summary['rejected_file'], 'w', newline='', encoding='utf-8')
+                    rejected_writer = csv.writer(rejected_handle)
+                    rejected_writer.writerow(['Line'] + fieldnames + ['Error'])
+                for entry in rejected:
+                    entry[0] += line
+                rejected_writer.writerows(rejected)
+                summary['rejected'] += len(rejected)
+
+            line += lines
+
+        if cancelled.is_set():
+            conn.rollback()
+            summary['cancelled'] = True
+        else:
+            report(1.0, "Committing...")
+            conn.commit()
+            committed = True
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        if executor is not None:
+            # By hand: shutdown(cancel_futures=True) needs Python 3.9
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown()
+        conn.execute(f"PRAGMA cache_size = {cache_size}")
+        for handle, key in ((rejected_handle, 'rejected_file'),
+                            (duplicates_handle, 'duplicates_file')):
+            if handle is not None:
+                handle.close()
+                # A rolled back import leaves no partial listing behind
+                if not committed:
+                    os.remove(summary[key])
+                    summary[key] = None
+
+    return summary
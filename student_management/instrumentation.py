@@ -0,0 +1,239 @@
+"""Query and operation timing for diagnostics
+
+Connections opened with factory=InstrumentedConnection report every
+statement to an Instrumentation recorder: call counts, latency histograms
+and row counts per statement, plus EXPLAIN QUERY PLAN output the first time
+a statement runs slower than the threshold. Application code times its own
+operations (tree rebuilds, imports) with Instrumentation.timed().
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+HISTOGRAM_BOUNDS_MS = (0.1, 1, 10, 100, 1000)
+SLOW_THRESHOLD_MS = 50
+SLOW_LOG_SIZE = 200
+
+class TimingStats:
+    """Call count, total/max latency, fetch time, rows and a latency histogram"""
+
+    __slots__ = ('calls', 'total_ms', 'max_ms', 'fetch_ms', 'rows', 'histogram')
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.fetch_ms = 0.0
+        self.rows = 0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+
+    def add(self, elapsed_ms, rows=0):
+        """Record one call"""
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.rows += rows
+        bucket = 0
+        while bucket < len(HISTOGRAM_BOUNDS_MS) and elapsed_ms >= HISTOGRAM_BOUNDS_MS[bucket]:
+            bucket += 1
+        self.histogram[bucket] += 1
+
+    def to_dict(self):
+        """Return the stats as plain JSON-friendly values"""
+        labels = [f"<{b}ms" for b in HISTOGRAM_BOUNDS_MS] + [f">={HISTOGRAM_BOUNDS_MS[-1]}ms"]
+        return {
+            'calls': self.calls,
+            'total_ms': round(self.total_ms, 3),
+            'avg_ms': round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'fetch_ms': round(self.fetch_ms, 3),
+            'rows': self.rows,
+            'histogram': dict(zip(labels, self.histogram)),
+        }
+
+class Instrumentation:
+    """Thread-safe recorder shared by every instrumented connection"""
+
+    def __init__(self, slow_threshold_ms=SLOW_THRESHOLD_MS):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self.lock:
+            self.statements = {}
+            self.operations = {}
+            self.plans = {}
+            self.slow_log = deque(maxlen=SLOW_LOG_SIZE)
+            self.started = datetime.now()
+
+    @staticmethod
+    def normalize(sql):
+        """Collapse whitespace so the same statement always gets one key"""
+        return re.sub(r'\s+', ' ', sql).strip()
+
+    def record_statement(self, sql, elapsed_ms, rows=0):
+        """Record one statement execution; return True if it was slow"""
+        with self.lock:
+            stats = self.statements.get(sql)
+            if stats is None:
+                stats = self.statements[sql] = TimingStats()
+            stats.add(elapsed_ms, rows)
+        return elapsed_ms >= self.slow_threshold_ms
+
+    def record_rows(self, sql, rows, elapsed_ms):
+        """Add rows fetched after the statement was executed
+
+        Fetch time is kept apart in fetch_ms: the call count, averages and
+        histogram describe the execute call alone.
+        """
+        with self.lock:
+            stats = self.statements.get(sql)
+            if stats is not None:
+                stats.rows += rows
+                stats.fetch_ms += elapsed_ms
+
+    def record_slow(self, sql, elapsed_ms, plan):
+        """Keep a slow statement in the slow log"""
+        with self.lock:
+            if plan is not None:
+                self.plans[sql] = plan
+            self.slow_log.append({
+                'time': datetime.now().isoformat(timespec='milliseconds'),
+                'sql': sql,
+                'ms': round(elapsed_ms, 3),
+                'plan': self.plans.get(sql),
+            })
+
+    def has_plan(self, sql):
+        """Return True if a query plan was already captured for sql"""
+        with self.lock:
+            return sql in self.plans
+
+    def record_operation(self, name, elapsed_ms, rows=0):
+        """Record one application-level operation"""
+        with self.lock:
+            stats = self.operations.get(name)
+            if stats is None:
+                stats = self.operations[name] = TimingStats()
+            stats.add(elapsed_ms, rows)
+
+    @contextmanager
+    def timed(self, name):
+        """Time the body of a with block as operation name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_operation(name, (time.perf_counter() - start) * 1000)
+
+    def snapshot(self):
+        """Return everything recorded as a JSON-friendly dict"""
+        with self.lock:
+            return {
+                'started': self.started.isoformat(timespec='seconds'),
+                'captured': datetime.now().isoformat(timespec='seconds'),
+                'slow_threshold_ms': self.slow_threshold_ms,
+                'statements': [dict(sql=sql, plan=self.plans.get(sql), **stats.to_dict())
+                               for sql, stats in sorted(self.statements.items(),
+                                                        key=lambda item: -item[1].total_ms)],
+                'operations': [dict(name=name, **stats.to_dict())
+                               for name, stats in sorted(self.operations.items())],
+                'slow_log': list(self.slow_log),
+            }
+
+    def export_json(self, filename):
+        """Write snapshot() to a JSON file"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports statement latency and row counts"""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.finish(sql, parameters, (time.perf_counter() - start) * 1000)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.finish(sql, None, (time.perf_counter() - start) * 1000)
+
+    def finish(self, sql, parameters, elapsed_ms):
+        """Record a finished execute and explain it if it was slow"""
+        instrumentation = self.connection.instrumentation
+        self.sql_key = instrumentation.normalize(sql)
+        rows = max(self.rowcount, 0)
+        if not instrumentation.record_statement(self.sql_key, elapsed_ms, rows):
+            return
+
+        plan = None
+        if parameters is not None and not instrumentation.has_plan(self.sql_key) \
+                and self.sql_key.split(' ', 1)[0].upper() in ('SELECT', 'WITH', 'INSERT',
+                                                               'UPDATE', 'DELETE'):
+            try:
+                explain = sqlite3.Cursor(self.connection)
+                explain.execute("EXPLAIN QUERY PLAN " + sql, parameters)
+                plan = [row[-1] for row in explain.fetchall()]
+            except sqlite3.Error:
+                pass
+        instrumentation.record_slow(self.sql_key, elapsed_ms, plan)
+
+    def __next__(self):
+        start = time.perf_counter()
+        row = super().__next__()
+        self.fetched(1, start)
+        return row
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self.fetched(0 if row is None else 1, start)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self.fetched(len(rows), start)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self.fetched(len(rows), start)
+        return rows
+
+    def fetched(self, rows, start):
+        """Record rows fetched since start"""
+        self.connection.instrumentation.record_rows(
+            self.sql_key, rows, (time.perf_counter() - start) * 1000)
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors report to self.instrumentation
+
+    Use as sqlite3.connect(..., factory=InstrumentedConnection) and set the
+    instrumentation attribute right after connecting.
+    """
+
+    instrumentation = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
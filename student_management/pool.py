@@ -0,0 +1,139 @@
+"""Read connection pool and single writer thread for a WAL database
+
+In WAL mode readers never wait for the writer, but SQLite still allows only
+one writer at a time. Every write is therefore queued to one Writer thread
+that owns the only read-write connection, so writes run in order and never
+fail with "database is locked"; reads borrow connections from a
+ReaderPool and run alongside them.
+"""
+
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+READER_POOL_SIZE = 4
+
+class ReaderPool:
+    """Up to size read-only connections shared between threads"""
+
+    def __init__(self, connect, size=READER_POOL_SIZE):
+        self.connect = connect
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.lock = threading.Lock()
+        self.all = []
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the body of a with block
+
+        Waits for a free connection once size connections are open.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self.idle.put(conn)
+
+    def acquire(self):
+        """Take an idle connection, opening a new one if the pool is not full"""
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            if self.opened < self.size:
+                self.opened += 1
+                try:
+                    conn = self.connect()
+                except BaseException:
+                    self.opened -= 1
+                    raise
+                self.all.append(conn)
+                return conn
+        return self.idle.get()
+
+    def close(self):
+        """Close every connection the pool opened"""
+        with self.lock:
+            for conn in self.all:
+                conn.close()
+            self.all = []
+            self.opened = 0
+            self.idle = queue.LifoQueue()
+
+class Writer:
+    """Thread that runs write jobs one at a time on its own connection
+
+    Jobs are func(conn, *args, **kwargs) and run in submission order. A job
+    that raises is rolled back so the next one starts clean. run() called
+    from inside a job runs the nested job directly instead of deadlocking.
+    """
+
+    def __init__(self, connect):
+        self.connect = connect
+        self.jobs = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue a job and return a Future for its result"""
+        future = Future()
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.work, name="sqlite-writer", daemon=True)
+                self.thread.start()
+            self.jobs.put((future, func, args, kwargs))
+        return future
+
+    def run(self, func, *args, **kwargs):
+        """Run a job on the writer and wait for its result"""
+        if threading.current_thread() is self.thread:
+            return func(self.conn, *args, **kwargs)
+        return self.submit(func, *args, **kwargs).result()
+
+    def work(self):
+        """Writer thread: open the connection and run jobs until closed"""
+        try:
+            self.conn = self.connect()
+        except BaseException as e:
+            self.conn = None
+            error = e
+        else:
+            error = None
+
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            future, func, args, kwargs = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            if error is not None:
+                future.set_exception(error)
+                continue
+            try:
+                result = func(self.conn, *args, **kwargs)
+            except BaseException as e:
+                if self.conn.in_transaction:
+                    self.conn.rollback()
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        if self.conn is not None:
+            self.conn.close()
+
+    def close(self):
+        """Finish the queued jobs and stop the thread"""
+        with self.lock:
+            thread, self.thread = self.thread, None
+            if thread is not None:
+                self.jobs.put(None)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
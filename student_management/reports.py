@@ -0,0 +1,231 @@
+"""Aggregated text reports over students, courses and enrollments"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from itertools import islice
+
+STUDENT_STATUSES = ('Active', 'Inactive', 'Graduated')
+REPORT_BATCH_SIZE = 5000
+STUDENT_LINE = "{1}, {0} - {2} ({3})\n"
+
+def data_version(cursor):
+    """Return a number that grows whenever students, courses or enrollments change
+
+    This is the last seq handed out to change_log, which AUTOINCREMENT
+    never reuses, even after pruning.
+    """
+    cursor.execute("""
+        SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'change_log'), 0)
+    """)
+    return cursor.fetchone()[0]
+
+def compute_summary(cursor):
+    """Compute every report aggregate with grouped queries
+
+    Students are read once, grouped by (status, enrollment year), and the
+    status and year totals are rolled up from that small result. Course and
+    credit totals come from one grouped pass each over enrollments.
+    """
+    cursor.execute("""
+        SELECT COALESCE(status, ''), COALESCE(strftime('%Y', enrollment_date), 'Unknown'), COUNT(*)
+        FROM students GROUP BY 1, 2
+    """)
+    total = 0
+    by_status = {}
+    by_year = {}
+    for status, year, count in cursor:
+        total += count
+        by_status[status] = by_status.get(status, 0) + count
+        by_year[year] = by_year.get(year, 0) + count
+
+    cursor.execute("""
+        SELECT c.course_code, c.course_name, c.credits,
+               COUNT(e.enrollment_id), COUNT(DISTINCT e.student_id)
+        FROM courses c
+        LEFT JOIN enrollments e ON e.course_id = c.course_id AND e.status != 'Dropped'
+        GROUP BY c.course_id ORDER BY c.course_code
+    """)
+    courses = [list(row) for row in cursor]
+
+    cursor.execute("""
+        SELECT COUNT(*), COALESCE(SUM(credits), 0), MIN(credits), MAX(credits)
+        FROM (SELECT SUM(c.credits) AS credits
+              FROM enrollments e JOIN courses c ON c.course_id = e.course_id
+              WHERE e.status != 'Dropped'
+              GROUP BY e.student_id)
+    """)
+    enrolled_students, total_credits, min_credits, max_credits = cursor.fetchone()
+
+    return {
+        'total': total,
+        'by_status': by_status,
+        'by_year': by_year,
+        'courses': courses,
+        'credits': {
+            'students': enrolled_students,
+            'total': total_credits,
+            'min': min_credits,
+            'max': max_credits,
+        },
+    }
+
+def store_summary(conn, version, summary):
+    """Save a summary in report_cache under the data version it was computed from"""
+    conn.execute("""
+        INSERT OR REPLACE INTO report_cache (name, version, payload)
+        VALUES ('summary', ?, ?)
+    """, (version, json.dumps(summary)))
+    conn.commit()
+
+def report_summary(conn, use_cache=True, store=None):
+    """Return the report aggregates, reusing the cached copy if nothing changed
+
+    The summary is stored in report_cache together with the data version it
+    was computed from, so repeated reports on an unchanged roster cost one
+    small query instead of a pass over every table. If store is given, a
+    fresh summary goes to store(version, summary) instead of being saved
+    on conn, which may be read-only.
+    """
+    cursor = conn.cursor()
+    version = data_version(cursor)
+
+    if use_cache:
+        cursor.execute("SELECT version, payload FROM report_cache WHERE name='summary'")
+        row = cursor.fetchone()
+        if row and row[0] == version:
+            return json.loads(row[1])
+
+    summary = compute_summary(cursor)
+    if store is not None:
+        store(version, summary)
+        return summary
+    try:
+        store_summary(conn, version, summary)
+    except sqlite3.OperationalError:
+        # Read-only connection: the summary is still valid, just not cached
+        pass
+    return summary
+
+def merge_summaries(summaries):
+    """Combine the summaries of databases holding disjoint sets of students
+
+    Counts add up; courses are matched by course code, and the credit
+    range spans every database.
+    """
+    merged = {'total': 0, 'by_status': {}, 'by_year': {}, 'courses': [],
+              'credits': {'students': 0, 'total': 0, 'min': None, 'max': None}}
+    courses = {}
+    for summary in summaries:
+        merged['total'] += summary['total']
+        for name in ('by_status', 'by_year'):
+            for key, count in summary[name].items():
+                merged[name][key] = merged[name].get(key, 0) + count
+        for code, name, credits, enrollments, students in summary['courses']:
+            course = courses.setdefault(code, [code, name, credits, 0, 0])
+            course[3] += enrollments
+            course[4] += students
+
+        credits = summary['credits']
+        total = merged['credits']
+        total['students'] += credits['students']
+        total['total'] += credits['total']
+        if credits['min'] is not None:
+            total['min'] = credits['min'] if total['min'] is None else min(total['min'], credits['min'])
+            total['max'] = credits['max'] if total['max'] is None else max(total['max'], credits['max'])
+    merged['courses'] = [courses[code] for code in sorted(courses)]
+    return merged
+
+def student_rows(cursor):
+    """Yield (first, last, email, status) in name order, fetched in batches"""
+    cursor.execute("""
+        SELECT first_name, last_name, email, status
+        FROM students ORDER BY last_name, first_name, student_id
+    """)
+    while True:
+        rows = cursor.fetchmany(REPORT_BATCH_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+def write_report(conn, filename, details=True, use_cache=True, report=None, cancelled=None,
+                 store=None):
+    """Write the text report, streaming the student list to disk
+
+    Returns the summary that was written, or None if cancelled.
+    """
+    summary = report_summary(conn, use_cache, store)
+    cursor = conn.cursor()
+    try:
+        return write_report_file(filename, summary, student_rows(cursor) if details else None,
+                                 report, cancelled)
+    finally:
+        cursor.close()
+
+def write_report_file(filename, summary, rows=None, report=None, cancelled=None,
+                      line=STUDENT_LINE):
+    """Write a report from a summary and, if given, name-ordered student rows
+
+    Each row is written as line.format(*row). Returns the summary, or None
+    if cancelled (the file is removed).
+    """
+    report = report or (lambda fraction, message: None)
+    cancelled = cancelled or threading.Event()
+
+    total = summary['total']
+    by_status = summary['by_status']
+    statuses = list(STUDENT_STATUSES) + sorted(s for s in by_status if s not in STUDENT_STATUSES)
+
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write("STUDENT MANAGEMENT SYSTEM REPORT\n")
+        f.write("=" * 40 + "\n\n")
+        f.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        f.write(f"Total Students: {total}\n")
+        for status in statuses:
+            f.write(f"{status or 'No Status'} Students: {by_status.get(status, 0)}\n")
+        f.write("\n")
+
+        f.write("ENROLLMENT YEARS:\n")
+        f.write("-" * 20 + "\n")
+        for year in sorted(summary['by_year']):
+            f.write(f"{year}: {summary['by_year'][year]}\n")
+        f.write("\n")
+
+        f.write("COURSES:\n")
+        f.write("-" * 20 + "\n")
+        if not summary['courses']:
+            f.write("No courses\n")
+        for code, name, credits, enrollments, students in summary['courses']:
+            f.write(f"{code} - {name} ({credits} credits): "
+                    f"{enrollments} enrollments, {students} students\n")
+        f.write("\n")
+
+        credits = summary['credits']
+        f.write("CREDITS:\n")
+        f.write("-" * 20 + "\n")
+        f.write(f"Students Enrolled in Courses: {credits['students']}\n")
+        f.write(f"Total Enrolled Credits: {credits['total']}\n")
+        if credits['students']:
+            f.write(f"Average Credits per Student: {credits['total'] / credits['students']:.1f}\n")
+            f.write(f"Credit Range: {credits['min']} - {credits['max']}\n")
+        f.write("\n")
+
+        if rows is not None:
+            f.write("STUDENT LIST:\n")
+            f.write("-" * 20 + "\n")
+
+            written = 0
+            while not cancelled.is_set():
+                batch = list(islice(rows, REPORT_BATCH_SIZE))
+                if not batch:
+                    break
+                f.writelines(line.format(*row) for row in batch)
+                written += len(batch)
+                report(written / (total or 1), f"Wrote {written} of {total} students...")
+
+    if cancelled.is_set():
+        os.remove(filename)
+        return None
+    return summary
@@ -0,0 +1,492 @@
+import sqlite3
+import csv
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from . import archive, changes, reports, schema
+from .cache import LRUCache
+from .courses import CourseRepository
+from .instrumentation import InstrumentedConnection
+from .pool import ReaderPool, Writer
+from .snapshot import StudentSnapshot
+
+DEFAULT_DB_PATH = 'student_management.db'
+LIST_COLUMNS = ('ID', 'First Name', 'Last Name', 'Email', 'Phone', 'Status')
+STUDENT_FIELDS = ('first_name', 'last_name', 'email', 'phone',
+                  'date_of_birth', 'address', 'status')
+EXPORT_BATCH_SIZE = 5000
+STUDENT_CACHE_SIZE = 4096
+EXPORT_COLUMNS = ['ID', 'First Name', 'Last Name', 'Email', 'Phone',
+                  'Date of Birth', 'Enrollment Date', 'Address', 'Status']
+
+class StudentRepository:
+    """Student database access with no dependency on the GUI
+
+    The database runs in WAL mode. The repository reads through its own
+    read-only connection on the thread that created it; every write is
+    queued to a single Writer thread, and background exports and reports
+    borrow connections from a ReaderPool, so reads never wait on writes.
+    Write methods may be called from any thread. Passing an
+    Instrumentation records the statements of every connection the
+    repository opens. A read_only repository has no writer and never
+    migrates: it raises FileNotFoundError if the database is missing and
+    sqlite3.DatabaseError if its schema is behind.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, read_only=False, instrumentation=None):
+        if read_only and not os.path.exists(db_path):
+            # A read-only repository cannot create the database
+            raise FileNotFoundError(f"Database not found: {db_path}")
+        self.db_path = db_path
+        self.read_only = read_only
+        self.instrumentation = instrumentation
+        self.student_cache = LRUCache(STUDENT_CACHE_SIZE)
+        self.snapshot = None
+        self.readers = ReaderPool(lambda: self.connect(read_only=True, check_same_thread=False))
+        self.writer = None if read_only else Writer(self.connect_writer)
+
+        # An up-to-date database opens without waiting for the writer thread
+        self.conn = self.connect(read_only=True) if os.path.exists(db_path) else None
+        if not read_only and (self.conn is None
+                              or schema.schema_version(self.conn) != schema.SCHEMA_VERSION):
+            if self.conn is not None:
+                self.conn.close()
+            self.writer.run(schema.migrate)
+            self.conn = self.connect(read_only=True)
+        elif read_only and schema.schema_version(self.conn) < schema.SCHEMA_VERSION:
+            version = schema.schema_version(self.conn)
+            self.conn.close()
+            raise sqlite3.DatabaseError(
+                f"Database {db_path} has schema version {version}, older than this program's "
+                f"({schema.SCHEMA_VERSION}); open it read-write once to upgrade it")
+        self.cursor = self.conn.cursor()
+        self.courses = CourseRepository(self.conn, self.writer)
+        self.fts_enabled = schema.has_search_index(self.conn)
+        self.archive_fts_enabled = schema.has_search_index(self.conn, 'archived_students_fts')
+
+    def connect(self, read_only=False, **kwargs):
+        """Open a new connection to the repository database"""
+        if self.instrumentation is not None:
+            kwargs['factory'] = InstrumentedConnection
+        if read_only:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, **kwargs)
+        else:
+            conn = sqlite3.connect(self.db_path, **kwargs)
+        if self.instrumentation is not None:
+            conn.instrumentation = self.instrumentation
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def connect_writer(self):
+        """Open the writer connection and switch the database to WAL"""
+        conn = self.connect(timeout=30)
+        conn.execute("PRAGMA journal_mode = WAL")
+        # WAL is durable at a checkpoint; NORMAL skips the fsync per commit
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def close(self):
+        """Stop the writer and close every connection"""
+        if self.writer is not None:
+            self.writer.close()
+        self.readers.close()
+        self.conn.close()
+
+    def add_student(self, first_name, last_name, email, phone=None,
+                    date_of_birth=None, address=None, status='Active'):
+        """Insert a student and return the new student_id"""
+        def work(conn):
+            cursor = conn.execute("""
+                INSERT INTO students (first_name, last_name, email, phone, date_of_birth, address, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (first_name, last_name, email, phone, date_of_birth, address, status))
+            conn.commit()
+            return cursor.lastrowid
+
+        return self.writer.run(work)
+
+    def update_student(self, student_id, first_name, last_name, email, phone=None,
+                       date_of_birth=None, address=None, status='Active'):
+        """Replace every editable field of a student"""
+        def work(conn):
+            conn.execute("""
+                UPDATE students
+                SET first_name=?, last_name=?, email=?, phone=?, date_of_birth=?, address=?, status=?
+                WHERE student_id=?
+            """, (first_name, last_name, email, phone, date_of_birth, address, status, student_id))
+            conn.commit()
+            self.student_cache.pop(student_id)
+
+        self.writer.run(work)
+
+    def delete_student(self, student_id):
+        """Delete a student and their enrollments for good (see archive_student)"""
+        def work(conn):
+            with conn:
+                conn.execute("DELETE FROM enrollments WHERE student_id=?", (student_id,))
+                conn.execute("DELETE FROM students WHERE student_id=?", (student_id,))
+            self.student_cache.pop(student_id)
+
+        self.writer.run(work)
+
+    def archive_student(self, student_id):
+        """Soft-delete a student by moving them and their enrollments to the archive"""
+        return self.archive_students(student_ids=[student_id])
+
+    def archive_students(self, statuses=archive.ARCHIVE_STATUSES, student_ids=None,
+                         report=None, cancelled=None):
+        """Move students with one of statuses, or the given ids, to the archive
+
+        Returns the number of students archived, or None if cancelled.
+        """
+        try:
+            if student_ids is not None:
+                return self.writer.run(archive.move_students, list(student_ids),
+                                       report=report, cancelled=cancelled)
+            return self.writer.run(archive.archive_by_status, tuple(statuses), report, cancelled)
+        finally:
+            self.student_cache.clear()
+
+    def restore_students(self, student_ids):
+        """Move archived students and their enrollments back; returns the count
+
+        Raises sqlite3.IntegrityError if a restored email is in use again.
+        """
+        return self.writer.run(archive.move_students, list(student_ids), restore=True)
+
+    def count_archived(self):
+        """Count the archived students"""
+        self.cursor.execute("SELECT COUNT(*) FROM archived_students")
+        return self.cursor.fetchone()[0]
+
+    def get_student(self, student_id):
+        """Return a student as a dict, or None if there is no such student
+
+        Records come from the LRU cache when possible; a cache miss loads
+        the record through prefetch_students.
+        """
+        student = self.student_cache.get(student_id)
+        if student is None:
+            self.prefetch_students([student_id])
+            student = self.student_cache.get(student_id)
+        return dict(student) if student else None
+
+    def prefetch_students(self, student_ids):
+        """Load the records of any uncached students with one query per 500 ids"""
+        missing = [i for i in student_ids if i not in self.student_cache]
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            self.cursor.execute(f"""
+                SELECT student_id, first_name, last_name, email, phone,
+                       date_of_birth, enrollment_date, address, status
+                FROM students WHERE student_id IN ({",".join("?" * len(chunk))})
+            """, chunk)
+            keys = [d[0] for d in self.cursor.description]
+            for row in self.cursor.fetchall():
+                self.student_cache.put(row[0], dict(zip(keys, row)))
+
+    def student_snapshot(self):
+        """Return the columnar roster snapshot, brought up to date
+
+        The snapshot is loaded on first use and afterwards refreshed from
+        change_log, so calling this after every write is cheap.
+        """
+        if self.snapshot is None:
+            self.snapshot = StudentSnapshot()
+        self.snapshot.refresh(self.conn)
+        return self.snapshot
+
+    @staticmethod
+    def list_where(filter_sql="", key_clause=""):
+        """Build the WHERE clause for a list filter and page key"""
+        clauses = [c for c in (filter_sql, key_clause) if c]
+        if not clauses:
+            return ""
+        return "WHERE " + " AND ".join(f"({c})" for c in clauses)
+
+    @staticmethod
+    def list_key(row):
+        """Return the keyset pagination key of a list row"""
+        return (row[2], row[1], row[0])
+
+    def get_list_row(self, student_id, filter_sql="", params=()):
+        """Return a student's list row if it passes a list filter, else None"""
+        self.cursor.execute(f"""
+            SELECT student_id, first_name, last_name, email, phone, status FROM students
+            {self.list_where(filter_sql, "student_id = ?")}
+        """, tuple(params) + (student_id,))
+        return self.cursor.fetchone()
+
+    @contextmanager
+    def read_cursor(self, conn=None):
+        """Yield the repository cursor, or a cursor on conn that is closed afterwards"""
+        if conn is None:
+            yield self.cursor
+            return
+        cursor = conn.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+    def count_students(self, filter_sql="", params=(), conn=None):
+        """Count the students matching a list filter
+
+        Pass a pooled conn to count from another thread.
+        """
+        with self.read_cursor(conn) as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM students {self.list_where(filter_sql)}", params)
+            return cursor.fetchone()[0]
+
+    def fetch_student_page(self, limit, filter_sql="", params=(), after=None, before=None, offset=0,
+                           conn=None):
+        """Fetch one page of list rows ordered by (last_name, first_name, student_id)
+
+        Pages next to one already on screen are fetched by key so SQLite can
+        seek straight to them; OFFSET is only meant for scrollbar jumps.
+        Pass a pooled conn to fetch from another thread.
+        """
+        select = "SELECT student_id, first_name, last_name, email, phone, status FROM students"
+        order = "last_name, first_name, student_id"
+        with self.read_cursor(conn) as cursor:
+            if after is not None:
+                cursor.execute(f"""
+                    {select} {self.list_where(filter_sql, "(last_name, first_name, student_id) > (?, ?, ?)")}
+                    ORDER BY {order} LIMIT ?
+                """, tuple(params) + tuple(after) + (limit,))
+                return cursor.fetchall()
+
+            if before is not None:
+                cursor.execute(f"""
+                    {select} {self.list_where(filter_sql, "(last_name, first_name, student_id) < (?, ?, ?)")}
+                    ORDER BY last_name DESC, first_name DESC, student_id DESC LIMIT ?
+                """, tuple(params) + tuple(before) + (limit,))
+                return cursor.fetchall()[::-1]
+
+            cursor.execute(f"""
+                {select} {self.list_where(filter_sql)}
+                ORDER BY {order} LIMIT ? OFFSET ?
+            """, tuple(params) + (limit, offset))
+            return cursor.fetchall()
+
+    def build_search_filter(self, search_term, table='students'):
+        """Build the list filter for a search term
+
+        Every word is matched anywhere in a name, email or phone. Words of
+        three or more characters go through the trigram index; shorter
+        ones, which a trigram cannot match, fall back to a LIKE scan.
+        table is students or archived_students.
+        """
+        fts_enabled = self.fts_enabled if table == 'students' else self.archive_fts_enabled
+        clauses = []
+        params = []
+        for word in search_term.split():
+            if fts_enabled and len(word) >= 3:
+                clauses.append(f"student_id IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ?)")
+                params.append('"' + word.replace('"', '""') + '"')
+            else:
+                clauses.append("first_name LIKE ? OR last_name LIKE ? OR email LIKE ? OR phone LIKE ?")
+                params.extend([f"%{word}%"] * 4)
+
+        return " AND ".join(f"({c})" for c in clauses), tuple(params)
+
+    def search_students(self, search_term, limit=50, include_archived=False):
+        """Return the best matches for a search term, most relevant first
+
+        With include_archived, archived matches follow the current ones up
+        to limit and every row ends with an archived flag (0 or 1).
+        """
+        rows = self.search_table('students', search_term, limit)
+        if not include_archived:
+            return rows
+        rows = [row + (0,) for row in rows]
+        if len(rows) < limit:
+            rows += [row + (1,) for row in
+                     self.search_table('archived_students', search_term, limit - len(rows))]
+        return rows
+
+    def search_table(self, table, search_term, limit, conn=None, scored=False):
+        """Return the list rows of students or archived_students matching a search term
+
+        Rows come most relevant first. With scored, each row ends with its
+        bm25 score (lower is better; 0.0 for a search without the index),
+        for merging with the results of another database.
+        """
+        where, params = self.build_search_filter(search_term, table)
+        words = [w for w in search_term.split() if len(w) >= 3]
+        fts_enabled = self.fts_enabled if table == 'students' else self.archive_fts_enabled
+        with self.read_cursor(conn) as cursor:
+            if not fts_enabled or not words:
+                cursor.execute(f"""
+                    SELECT student_id, first_name, last_name, email, phone, status
+                           {", 0.0" if scored else ""}
+                    FROM {table}
+                    {self.list_where(where)}
+                    ORDER BY last_name, first_name, student_id LIMIT ?
+                """, params + (limit,))
+                return cursor.fetchall()
+
+            query = " AND ".join('"' + w.replace('"', '""') + '"' for w in words)
+            cursor.execute(f"""
+                SELECT s.student_id, s.first_name, s.last_name, s.email, s.phone, s.status
+                       {", f.score" if scored else ""}
+                FROM {table} s
+                JOIN (SELECT rowid, bm25({table}_fts, 2.0, 2.0, 1.0, 1.0) AS score
+                      FROM {table}_fts WHERE {table}_fts MATCH ?) f
+                  ON s.student_id = f.rowid
+                WHERE {where}
+                ORDER BY f.score, s.last_name, s.first_name, s.student_id
+                LIMIT ?
+            """, (query,) + params + (limit,))
+            return cursor.fetchall()
+
+    def import_students(self, filename, upsert=False, report=None, cancelled=None, workers=None,
+                        check_duplicates=False):
+        """Import a students CSV file in one transaction
+
+        Large files are parsed and validated by a pool of worker processes
+        (see importer.import_csv) while this repository's writer inserts
+        the clean rows; reads carry on against the last committed data
+        meanwhile. Existing emails are updated or skipped through
+        ON CONFLICT(email), and rejected lines are listed with the reason
+        in a *_rejected.csv file next to the input. check_duplicates lists
+        rows that probably repeat a student already on file under another
+        email in a *_duplicates.csv file. report(fraction, message) is
+        called as batches are inserted and setting the cancelled event
+        rolls the whole import back.
+        """
+        # Imported here: multiprocessing and the process pool are slow to import
+        from . import importer
+
+        try:
+            return self.writer.run(importer.import_csv, filename, upsert, report, cancelled, workers,
+                                   check_duplicates)
+        finally:
+            self.student_cache.clear()
+
+    def find_duplicates(self, threshold=None, report=None, cancelled=None):
+        """Return (score, student_id, other_id) for likely duplicate students, best first
+
+        The blocking key index is brought up to date on the writer first,
+        then candidate pairs are scored on a pooled read connection (see
+        duplicates.find_duplicates). Returns None if cancelled.
+        """
+        from . import duplicates
+
+        self.writer.run(duplicates.refresh_keys)
+        with self.readers.connection() as conn:
+            return duplicates.find_duplicates(conn, threshold or duplicates.DUPLICATE_THRESHOLD,
+                                              report, cancelled)
+
+    def export_students(self, filename, report=None, cancelled=None):
+        """Stream the students table to a file in EXPORT_BATCH_SIZE batches
+
+        The format follows the file name: .jsonl writes one JSON object per
+        line, anything else writes CSV, and a trailing .gz compresses it.
+        Returns the number of rows written, or None if cancelled.
+        """
+        report = report or (lambda fraction, message: None)
+        cancelled = cancelled or threading.Event()
+
+        base, extension = os.path.splitext(filename.lower())
+        compressed = extension == '.gz'
+        if compressed:
+            extension = os.path.splitext(base)[1]
+        as_json = extension == '.jsonl'
+
+        with self.readers.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM students")
+            total = cursor.fetchone()[0]
+
+            cursor.execute("""
+                SELECT student_id, first_name, last_name, email, phone,
+                       date_of_birth, enrollment_date, address, status
+                FROM students ORDER BY last_name, first_name, student_id
+            """)
+            keys = [d[0] for d in cursor.description]
+
+            if compressed:
+                import gzip
+                f = gzip.open(filename, 'wt', newline='', encoding='utf-8')
+            else:
+                f = open(filename, 'w', newline='', encoding='utf-8')
+
+            exported = 0
+            finished = False
+            with f:
+                if not as_json:
+                    writer = csv.writer(f)
+                    writer.writerow(EXPORT_COLUMNS)
+
+                while True:
+                    rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                    if not rows:
+                        finished = True
+                        break
+                    # A cancel that arrives after the last batch keeps the finished file
+                    if cancelled.is_set():
+                        break
+                    if as_json:
+                        f.writelines(json.dumps(dict(zip(keys, row))) + "\n" for row in rows)
+                    else:
+                        writer.writerows(rows)
+                    exported += len(rows)
+                    report(exported / (total or 1), f"Exported {exported} of {total} students...")
+            # Release the read snapshot before the connection goes back to the pool
+            cursor.close()
+
+        if not finished:
+            os.remove(filename)
+            return None
+        return exported
+
+    def export_changes(self, filename, since=None, feed=None, report=None, cancelled=None):
+        """Write the rows changed after a checkpoint as JSON Lines
+
+        since is a change_log seq; feed names a checkpoint instead, which
+        is moved forward once the file is written. A feed with no
+        checkpoint yet, or a since the pruned log no longer covers, gets
+        every current row (see changes.export_changes). Returns the
+        summary dict, or None if cancelled.
+        """
+        with self.readers.connection() as conn:
+            if feed is not None and since is None:
+                since = changes.get_checkpoint(conn.cursor(), feed)
+            summary = changes.export_changes(conn, filename, since, report, cancelled)
+
+        if summary is None:
+            os.remove(filename)
+            return None
+        if feed is not None:
+            self.writer.run(changes.save_checkpoint, feed, summary['upto'])
+        return summary
+
+    def list_feeds(self):
+        """Return (feed, seq, exported_at) for every export checkpoint"""
+        self.cursor.execute("SELECT feed, seq, exported_at FROM export_checkpoints ORDER BY feed")
+        return self.cursor.fetchall()
+
+    def prune_change_log(self):
+        """Drop change_log entries that every feed and derived table has read"""
+        return self.writer.run(changes.prune_change_log)
+
+    def report_summary(self, use_cache=True):
+        """Return status, enrollment-year, course and credit aggregates"""
+        return reports.report_summary(self.conn, use_cache, self.store_summary)
+
+    def store_summary(self, version, summary):
+        """Queue a computed report summary for the report cache"""
+        if self.writer is not None:
+            self.writer.submit(reports.store_summary, version, summary)
+
+    def write_report(self, filename, details=True, use_cache=True, report=None, cancelled=None):
+        """Write the text report on a pooled read connection
+
+        See reports.write_report; safe to call from a worker thread.
+        """
+        with self.readers.connection() as conn:
+            return reports.write_report(conn, filename, details, use_cache, report, cancelled,
+                                        self.store_summary)
@@ -0,0 +1,323 @@
+"""Versioned schema migrations tracked with PRAGMA user_version
+
+Each migration brings the database from version N-1 to N inside its own
+transaction, so an interrupted upgrade resumes where it stopped. Databases
+created before migrations existed report user_version 0; every step uses
+IF NOT EXISTS, so they are upgraded in place.
+"""
+
+import sqlite3
+
+def create_tables(cursor):
+    """Version 1: students, courses and enrollments"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS students (
+            student_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            phone TEXT,
+            date_of_birth DATE,
+            enrollment_date DATE DEFAULT CURRENT_DATE,
+            address TEXT,
+            status TEXT DEFAULT 'Active'
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS courses (
+            course_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_code TEXT UNIQUE NOT NULL,
+            course_name TEXT NOT NULL,
+            credits INTEGER DEFAULT 3,
+            instructor TEXT,
+            description TEXT
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS enrollments (
+            enrollment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER,
+            course_id INTEGER,
+            enrollment_date DATE DEFAULT CURRENT_DATE,
+            grade TEXT,
+            status TEXT DEFAULT 'Enrolled',
+            FOREIGN KEY (student_id) REFERENCES students (student_id),
+            FOREIGN KEY (course_id) REFERENCES courses (course_id)
+        )
+    """)
+
+def create_search_index(cursor):
+    """Version 2: FTS5 trigram index over students, backfilled from the table"""
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5(
+                first_name, last_name, email, phone,
+                content='students', content_rowid='student_id',
+                tokenize='trigram'
+            )
+        """)
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5 or the trigram tokenizer; search uses LIKE
+        return
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS students_fts_ai AFTER INSERT ON students BEGIN
+            INSERT INTO students_fts (rowid, first_name, last_name, email, phone)
+            VALUES (new.student_id, new.first_name, new.last_name, new.email, new.phone);
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS students_fts_ad AFTER DELETE ON students BEGIN
+            INSERT INTO students_fts (students_fts, rowid, first_name, last_name, email, phone)
+            VALUES ('delete', old.student_id, old.first_name, old.last_name, old.email, old.phone);
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS students_fts_au
+        AFTER UPDATE OF first_name, last_name, email, phone ON students BEGIN
+            INSERT INTO students_fts (students_fts, rowid, first_name, last_name, email, phone)
+            VALUES ('delete', old.student_id, old.first_name, old.last_name, old.email, old.phone);
+            INSERT INTO students_fts (rowid, first_name, last_name, email, phone)
+            VALUES (new.student_id, new.first_name, new.last_name, new.email, new.phone);
+        END
+    """)
+
+    cursor.execute("INSERT INTO students_fts (students_fts) VALUES ('rebuild')")
+
+def create_report_tables(cursor):
+    """Version 3: the report summary cache
+
+    Summaries are stored with reports.data_version, the last change_log
+    seq, and reused until it moves.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS report_cache (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            payload TEXT NOT NULL
+        )
+    """)
+
+def create_indexes(cursor):
+    """Version 4: covering index for the list order, status and enrollment keys
+
+    idx_students_name holds every list column, so list pages and keyset
+    seeks are answered from the index without touching the table.
+    """
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_students_name
+        ON students (last_name, first_name, student_id, email, phone, status)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_status ON students (status)")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_enrollments_student
+        ON enrollments (student_id, course_id)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_enrollments_course
+        ON enrollments (course_id, student_id)
+    """)
+
+def create_grade_points(cursor):
+    """Version 5: letter grade to grade point lookup used for GPA"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS grade_points (
+            grade TEXT PRIMARY KEY,
+            points REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+    cursor.executemany("INSERT OR IGNORE INTO grade_points VALUES (?, ?)", [
+        ('A+', 4.0), ('A', 4.0), ('A-', 3.7),
+        ('B+', 3.3), ('B', 3.0), ('B-', 2.7),
+        ('C+', 2.3), ('C', 2.0), ('C-', 1.7),
+        ('D+', 1.3), ('D', 1.0), ('D-', 0.7),
+        ('F', 0.0),
+    ])
+
+def create_change_log(cursor):
+    """Version 6: sequence-numbered log of student inserts, updates and deletes
+
+    Readers that keep a copy of the roster remember the last seq they saw
+    and reload only the rows logged after it.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            operation TEXT NOT NULL
+        )
+    """)
+    for event, row in (('INSERT', 'new'), ('UPDATE', 'new'), ('DELETE', 'old')):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS students_log_{event.lower()}
+            AFTER {event} ON students BEGIN
+                INSERT INTO change_log (table_name, row_id, operation)
+                VALUES ('students', {row}.student_id, '{event}');
+            END
+        """)
+
+def create_change_feeds(cursor):
+    """Version 7: log course and enrollment changes too, and feed checkpoints
+
+    export_checkpoints remembers the last change_log seq each named
+    downstream feed has exported.
+    """
+    for table, key in (('courses', 'course_id'), ('enrollments', 'enrollment_id')):
+        for event, row in (('INSERT', 'new'), ('UPDATE', 'new'), ('DELETE', 'old')):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_log_{event.lower()}
+                AFTER {event} ON {table} BEGIN
+                    INSERT INTO change_log (table_name, row_id, operation)
+                    VALUES ('{table}', {row}.{key}, '{event}');
+                END
+            """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS export_checkpoints (
+            feed TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL,
+            exported_at TEXT NOT NULL
+        )
+    """)
+
+def create_archive_tables(cursor):
+    """Version 8: archive tables for students moved out of the hot tables
+
+    Archived rows keep their ids; students and enrollments never reuse an
+    id (AUTOINCREMENT), so a restored row cannot collide with a new one.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS archived_students (
+            student_id INTEGER PRIMARY KEY,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            phone TEXT,
+            date_of_birth DATE,
+            enrollment_date DATE,
+            address TEXT,
+            status TEXT,
+            archived_at TEXT NOT NULL
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS archived_enrollments (
+            enrollment_id INTEGER PRIMARY KEY,
+            student_id INTEGER NOT NULL,
+            course_id INTEGER,
+            enrollment_date DATE,
+            grade TEXT,
+            status TEXT,
+            archived_at TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_archived_students_name
+        ON archived_students (last_name, first_name, student_id)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_archived_enrollments_student
+        ON archived_enrollments (student_id)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_archived_enrollments_course
+        ON archived_enrollments (course_id)
+    """)
+
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS archived_students_fts USING fts5(
+                first_name, last_name, email, phone,
+                content='archived_students', content_rowid='student_id',
+                tokenize='trigram'
+            )
+        """)
+    except sqlite3.OperationalError:
+        return
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS archived_students_fts_ai AFTER INSERT ON archived_students BEGIN
+            INSERT INTO archived_students_fts (rowid, first_name, last_name, email, phone)
+            VALUES (new.student_id, new.first_name, new.last_name, new.email, new.phone);
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS archived_students_fts_ad AFTER DELETE ON archived_students BEGIN
+            INSERT INTO archived_students_fts (archived_students_fts, rowid, first_name, last_name,
+                                               email, phone)
+            VALUES ('delete', old.student_id, old.first_name, old.last_name, old.email, old.phone);
+        END
+    """)
+
+def create_match_keys(cursor):
+    """Version 9: blocking keys for duplicate detection, and log positions
+
+    One row per (key, student); students sharing a key are the only pairs
+    duplicates.find_duplicates compares. The table is derived data, kept
+    current from change_log by duplicates.refresh_keys, which keeps its
+    change_log position in log_positions: derived tables follow the log
+    like a feed does, but are not exports.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS match_keys (
+            key TEXT NOT NULL,
+            student_id INTEGER NOT NULL,
+            PRIMARY KEY (key, student_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_match_keys_student ON match_keys (student_id)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS log_positions (
+            name TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL
+        )
+    """)
+
+MIGRATIONS = [
+    create_tables,
+    create_search_index,
+    create_report_tables,
+    create_indexes,
+    create_grade_points,
+    create_change_log,
+    create_change_feeds,
+    create_archive_tables,
+    create_match_keys,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def schema_version(conn):
+    """Return the migration version recorded in the database"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    """Apply every pending migration and return the version the database had"""
+    version = schema_version(conn)
+    if version > SCHEMA_VERSION:
+        raise sqlite3.DatabaseError(
+            f"Database schema version {version} is newer than this program supports ({SCHEMA_VERSION})")
+
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    return version
+
+def has_search_index(conn, name='students_fts'):
+    """Return True if an FTS5 search index exists"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name=?", (name,)).fetchone() is not None
@@ -0,0 +1,231 @@
+"""Columnar in-memory copy of the student list for client-side sort and filter
+
+The snapshot keeps one Python list per list column plus casefolded sort
+keys, with status values interned so every row shares a handful of
+strings. Views (a sort order, status filter and search) are lists of row
+positions: sort orders come from C-level list sorts and searches from one
+casefolded string per row, both cached until the data changes. refresh()
+follows change_log and reloads only the students changed since the last
+seq it saw.
+"""
+
+import sys
+from array import array
+
+from .changes import log_bounds
+
+# List columns in LIST_COLUMNS order, and the sort key column of each
+SNAPSHOT_COLUMNS = ('student_id', 'first_name', 'last_name', 'email', 'phone', 'status')
+SORT_KEYS = {
+    'student_id': 'ids',
+    'first_name': 'first_keys',
+    'last_name': 'last_keys',
+    'email': 'email_keys',
+    'phone': 'phones',
+    'status': 'statuses',
+}
+DEFAULT_SORT = (('last_name', False), ('first_name', False), ('student_id', False))
+SEARCH_COLUMNS = ('first_keys', 'last_keys', 'email_keys', 'phones')
+# Joins the searched columns, so a search word never spans two of them
+SEARCH_SEPARATOR = '\x1f'
+SNAPSHOT_BATCH_SIZE = 5000
+# Reload everything when more than this fraction of the rows changed
+FULL_RELOAD_FRACTION = 0.25
+
+def sort_key(value):
+    """Casefolded key, sharing the value itself when it is already folded"""
+    if not value:
+        return ''
+    key = value.casefold()
+    return value if key == value else key
+
+class StudentSnapshot:
+    """Column arrays of every student, kept current through change_log"""
+
+    def __init__(self):
+        self.ids = array('q')
+        self.first_names = []
+        self.last_names = []
+        self.emails = []
+        self.phones = []
+        self.statuses = []
+        self.first_keys = []
+        self.last_keys = []
+        self.email_keys = []
+        self.position = {}
+        self.seq = None
+        self.orders = {}
+        self.search_keys = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def clear(self):
+        """Drop every row"""
+        for column in (self.ids, self.first_names, self.last_names, self.emails, self.phones,
+                       self.statuses, self.first_keys, self.last_keys, self.email_keys):
+            del column[:]
+        self.position.clear()
+        self.invalidate()
+
+    def invalidate(self):
+        """Forget cached sort orders and search keys after a change"""
+        self.orders.clear()
+        self.search_keys = None
+
+    def row(self, i):
+        """Return the list row at position i"""
+        return (self.ids[i], self.first_names[i], self.last_names[i], self.emails[i],
+                self.phones[i], self.statuses[i])
+
+    def put(self, row):
+        """Insert or overwrite one list row"""
+        student_id, first, last, email, phone, status = row
+        status = sys.intern(status) if status else ''
+        i = self.position.get(student_id)
+        if i is None:
+            self.position[student_id] = len(self.ids)
+            self.ids.append(student_id)
+            self.first_names.append(first)
+            self.last_names.append(last)
+            self.emails.append(email)
+            self.phones.append(phone or '')
+            self.statuses.append(status)
+            self.first_keys.append(sort_key(first))
+            self.last_keys.append(sort_key(last))
+            self.email_keys.append(sort_key(email))
+        else:
+            self.first_names[i] = first
+            self.last_names[i] = last
+            self.emails[i] = email
+            self.phones[i] = phone or ''
+            self.statuses[i] = status
+            self.first_keys[i] = sort_key(first)
+            self.last_keys[i] = sort_key(last)
+            self.email_keys[i] = sort_key(email)
+        self.invalidate()
+
+    def remove(self, student_id):
+        """Remove a student by moving the last row into its slot"""
+        i = self.position.pop(student_id, None)
+        if i is None:
+            return
+        last = len(self.ids) - 1
+        for column in (self.ids, self.first_names, self.last_names, self.emails, self.phones,
+                       self.statuses, self.first_keys, self.last_keys, self.email_keys):
+            column[i] = column[last]
+            column.pop()
+        if i != last:
+            self.position[self.ids[i]] = i
+        self.invalidate()
+
+    def current_seq(self, cursor):
+        """Return the newest change_log seq"""
+        return log_bounds(cursor)[1]
+
+    def load(self, conn):
+        """Read every student into the snapshot"""
+        cursor = conn.cursor()
+        # Read the seq first: changes made during the load are applied again later
+        seq = self.current_seq(cursor)
+        self.clear()
+        cursor.execute(f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM students")
+        while True:
+            rows = cursor.fetchmany(SNAPSHOT_BATCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                self.put(row)
+        self.seq = seq
+
+    def refresh(self, conn):
+        """Apply the students changed since the last load or refresh
+
+        Returns True if anything changed. Falls back to a full load on the
+        first call, when a large share of the roster changed and when the
+        log entries it needs were pruned.
+        """
+        if self.seq is None:
+            self.load(conn)
+            return True
+
+        cursor = conn.cursor()
+        oldest, seq = log_bounds(cursor)
+        if seq == self.seq:
+            return False
+        if oldest is not None and oldest > self.seq + 1:
+            # The entries since our seq were pruned
+            self.load(conn)
+            return True
+
+        cursor.execute("""
+            SELECT DISTINCT row_id FROM change_log WHERE seq > ? AND table_name = 'students'
+        """, (self.seq,))
+        changed = [row[0] for row in cursor.fetchall()]
+        if len(changed) > FULL_RELOAD_FRACTION * max(len(self), 1000):
+            self.load(conn)
+            return True
+
+        for start in range(0, len(changed), 500):
+            chunk = changed[start:start + 500]
+            cursor.execute(f"""
+                SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM students
+                WHERE student_id IN ({",".join("?" * len(chunk))})
+            """, chunk)
+            found = set()
+            for row in cursor.fetchall():
+                self.put(row)
+                found.add(row[0])
+            for student_id in chunk:
+                if student_id not in found:
+                    self.remove(student_id)
+
+        self.seq = seq
+        return True
+
+    def sorted_order(self, sort):
+        """Return every row position in sort order, cached per sort
+
+        The DEFAULT_SORT columns not in sort break ties, so rows with
+        equal values keep the order of the default list whatever order
+        they were loaded, added or moved in.
+        """
+        order = self.orders.get(sort)
+        if order is None:
+            columns = {column for column, _ in sort}
+            keys = tuple(sort) + tuple(key for key in DEFAULT_SORT if key[0] not in columns)
+            order = list(range(len(self)))
+            # Stable sorts from the least significant key give the multi-column order
+            for column, descending in reversed(keys):
+                order.sort(key=getattr(self, SORT_KEYS[column]).__getitem__, reverse=descending)
+            self.orders[sort] = order
+        return order
+
+    def search_strings(self):
+        """Return the casefolded name, email and phone of every row as one string each"""
+        if self.search_keys is None:
+            columns = [getattr(self, column) for column in SEARCH_COLUMNS]
+            self.search_keys = [SEARCH_SEPARATOR.join(values) for values in zip(*columns)]
+        return self.search_keys
+
+    def view(self, sort=DEFAULT_SORT, statuses=None, search=""):
+        """Return row positions filtered and ordered for display
+
+        sort is a sequence of (column, descending) pairs, most significant
+        first; statuses limits the rows to those statuses; every word of
+        search has to appear somewhere in the first name, last name, email
+        or phone, ignoring case, as in StudentRepository.build_search_filter.
+        The full order of each sort is cached, so changing the filter or
+        the search term only costs a pass over it. Positions are valid
+        until the snapshot changes.
+        """
+        order = self.sorted_order(tuple(sort) or DEFAULT_SORT)
+        if statuses:
+            statuses = frozenset(statuses)
+            status_column = self.statuses
+            order = [i for i in order if status_column[i] in statuses]
+        words = [sort_key(word) for word in search.split()]
+        if words:
+            keys = self.search_strings()
+            order = [i for i in order if all(word in keys[i] for word in words)]
+        return order
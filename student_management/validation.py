@@ -0,0 +1,31 @@
+"""Field checks shared by the student form and CSV imports"""
+
+import re
+from datetime import datetime
+
+from .reports import STUDENT_STATUSES
+
+EMAIL_PATTERN = re.compile(r'[^@\s]+@[^@\s]+\.[^@\s]+')
+
+def check_student(first_name, last_name, email, date_of_birth=None, status=None):
+    """Return why a student record is invalid, or None if it is valid
+
+    Empty date_of_birth and status are allowed; status otherwise has to be
+    one of STUDENT_STATUSES exactly.
+    """
+    if not first_name:
+        return "First name is required"
+    if not last_name:
+        return "Last name is required"
+    if not email:
+        return "Email is required"
+    if not EMAIL_PATTERN.fullmatch(email):
+        return "Email address is not valid"
+    if date_of_birth:
+        try:
+            datetime.strptime(date_of_birth, '%Y-%m-%d')
+        except ValueError:
+            return "Date of birth must be in YYYY-MM-DD format"
+    if status and status not in STUDENT_STATUSES:
+        return f"Status must be one of {', '.join(STUDENT_STATUSES)}"
+    return None
@@ -0,0 +1,32 @@
+"""Shared fixtures: a fresh student database per test"""
+
+import itertools
+
+import pytest
+
+from student_management import StudentRepository
+
+# Repeated names, so keyset paging has to break ties on student_id
+NAMES = [('Ann', 'Lee'), ('Bob', 'Lee'), ('Ann', 'Lee'), ('Cy', 'Adams'), ('Dee', 'Zhou'),
+         ('Eve', 'Adams'), ('Ann', 'Lee'), ('Fay', 'Moss'), ('Gus', 'Moss'), ('Hal', 'Baker')]
+# Keeps emails unique across calls
+EMAIL_NUMBERS = itertools.count()
+
+def add_students(repo, count, domain='example.edu'):
+    """Add count students cycling through NAMES and return their ids"""
+    ids = []
+    for i in range(count):
+        first, last = NAMES[i % len(NAMES)]
+        email = f"{first}.{last}.{next(EMAIL_NUMBERS)}@{domain}".lower()
+        ids.append(repo.add_student(first, last, email))
+    return ids
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'students.db')
+
+@pytest.fixture
+def repo(db_path):
+    repo = StudentRepository(db_path)
+    yield repo
+    repo.close()
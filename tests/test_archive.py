@@ -0,0 +1,54 @@
+"""Archiving students and restoring them"""
+
+import sqlite3
+
+import pytest
+
+from conftest import add_students
+
+def enrollments(repo, student_id):
+    return repo.conn.execute(
+        "SELECT course_id, status FROM enrollments WHERE student_id = ?", (student_id,)).fetchall()
+
+def test_archive_and_restore_round_trip(repo):
+    ids = add_students(repo, 2)
+    student = repo.get_student(ids[1])
+    repo.update_student(ids[1], student['first_name'], student['last_name'], student['email'],
+                        status='Graduated')
+    before = repo.get_student(ids[1])
+    course_id = repo.courses.add_course('CS101', 'Programming')
+    repo.courses.enroll_student(ids[1], course_id)
+
+    assert repo.archive_students() == 1
+    assert repo.get_student(ids[1]) is None
+    assert enrollments(repo, ids[1]) == []
+    assert repo.count_students() == 1
+    assert repo.count_archived() == 1
+    assert [row[0] for row in repo.search_students('lee')] == [ids[0]]
+    assert [(row[0], row[-1]) for row in repo.search_students('lee', include_archived=True)] == [
+        (ids[0], 0), (ids[1], 1)]
+
+    assert repo.restore_students([ids[1]]) == 1
+    assert repo.get_student(ids[1]) == before
+    assert enrollments(repo, ids[1]) == [(course_id, 'Enrolled')]
+    assert repo.count_archived() == 0
+    assert repo.count_students() == 2
+
+def test_restore_fails_if_the_email_was_taken(repo):
+    student_id = add_students(repo, 1)[0]
+    email = repo.get_student(student_id)['email']
+    repo.archive_student(student_id)
+    repo.add_student('New', 'Student', email)
+
+    with pytest.raises(sqlite3.IntegrityError):
+        repo.restore_students([student_id])
+    assert repo.count_archived() == 1
+    assert repo.get_student(student_id) is None
+
+def test_delete_is_permanent(repo):
+    student_id = add_students(repo, 1)[0]
+    repo.delete_student(student_id)
+
+    assert repo.get_student(student_id) is None
+    assert repo.count_archived() == 0
+    assert repo.search_students('lee', include_archived=True) == []
@@ -0,0 +1,105 @@
+"""change_log feeds: incremental exports, checkpoints and pruning"""
+
+import gzip
+import json
+import os
+import threading
+
+from student_management import changes
+
+from conftest import add_students
+
+def read_feed(filename):
+    with open(filename, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+def test_new_feed_gets_every_row(repo, tmp_path):
+    add_students(repo, 3)
+    course_id = repo.courses.add_course('CS101', 'Programming')
+    repo.courses.enroll_student(1, course_id)
+
+    summary = repo.export_changes(str(tmp_path / 'full.jsonl'), feed='nightly')
+    entries = read_feed(tmp_path / 'full.jsonl')
+
+    assert summary['full'] and summary['written'] == 5
+    assert [(e['table'], e['id'], e['op']) for e in entries] == [
+        ('students', 1, 'upsert'), ('students', 2, 'upsert'), ('students', 3, 'upsert'),
+        ('courses', course_id, 'upsert'), ('enrollments', 1, 'upsert')]
+    assert repo.list_feeds()[0][:2] == ('nightly', summary['upto'])
+
+def test_incremental_export_lists_each_changed_row_once(repo, tmp_path):
+    add_students(repo, 3)
+    repo.export_changes(str(tmp_path / 'full.jsonl'), feed='nightly')
+
+    repo.update_student(2, 'Bea', 'Lee', 'bea@example.edu')
+    repo.delete_student(3)
+    repo.update_student(2, 'Bee', 'Lee', 'bee@example.edu')
+    new_id = add_students(repo, 1)[0]
+
+    summary = repo.export_changes(str(tmp_path / 'delta.jsonl'), feed='nightly')
+    entries = read_feed(tmp_path / 'delta.jsonl')
+
+    assert not summary['full']
+    assert [(e['id'], e['op']) for e in entries] == [(3, 'delete'), (2, 'upsert'), (new_id, 'upsert')]
+    assert entries[0]['row'] is None
+    assert entries[1]['row']['first_name'] == 'Bee'
+    assert [e['seq'] for e in entries] == sorted(e['seq'] for e in entries)
+
+    summary = repo.export_changes(str(tmp_path / 'empty.jsonl'), feed='nightly')
+    assert summary['written'] == 0 and read_feed(tmp_path / 'empty.jsonl') == []
+
+def test_export_since_a_seq(repo, tmp_path):
+    add_students(repo, 2)
+    since = repo.export_changes(str(tmp_path / 'full.jsonl'))['upto']
+    repo.update_student(1, 'Al', 'Lee', 'al@example.edu')
+
+    repo.export_changes(str(tmp_path / 'delta.jsonl.gz'), since=since)
+    with gzip.open(tmp_path / 'delta.jsonl.gz', 'rt', encoding='utf-8') as f:
+        assert [json.loads(line)['id'] for line in f] == [1]
+    assert repo.list_feeds() == []
+
+def test_cancelled_export_keeps_the_checkpoint(repo, tmp_path):
+    add_students(repo, 3)
+    cancelled = threading.Event()
+    cancelled.set()
+
+    assert repo.export_changes(str(tmp_path / 'full.jsonl'), feed='nightly',
+                               cancelled=cancelled) is None
+    assert not os.path.exists(tmp_path / 'full.jsonl')
+    assert repo.list_feeds() == []
+
+def test_prune_keeps_what_a_reader_has_not_seen(repo, tmp_path):
+    add_students(repo, 5)
+    assert repo.prune_change_log() == 0
+
+    upto = repo.export_changes(str(tmp_path / 'a.jsonl'), feed='nightly')['upto']
+    repo.writer.run(changes.save_position, 'duplicate-keys', 2)
+    add_students(repo, 2)
+
+    # duplicate-keys is the furthest behind, at seq 2
+    assert repo.prune_change_log() == 2
+    repo.writer.run(changes.save_position, 'duplicate-keys', upto + 2)
+    assert repo.prune_change_log() == upto - 2
+    # nightly has not read the two new inserts
+    oldest, newest = changes.log_bounds(repo.conn.cursor())
+    assert (oldest, newest) == (upto + 1, upto + 2)
+
+def test_prune_keeps_the_newest_entry(repo, tmp_path):
+    add_students(repo, 3)
+    repo.export_changes(str(tmp_path / 'a.jsonl'), feed='nightly')
+    repo.prune_change_log()
+    assert changes.log_bounds(repo.conn.cursor()) == (3, 3)
+
+    new_id = add_students(repo, 1)[0]
+    repo.export_changes(str(tmp_path / 'b.jsonl'), feed='nightly')
+    assert [e['id'] for e in read_feed(tmp_path / 'b.jsonl')] == [new_id]
+
+def test_pruned_past_since_falls_back_to_a_full_export(repo, tmp_path):
+    add_students(repo, 4)
+    repo.export_changes(str(tmp_path / 'a.jsonl'), feed='nightly')
+    add_students(repo, 1)
+    repo.export_changes(str(tmp_path / 'b.jsonl'), feed='nightly')
+    repo.prune_change_log()
+
+    summary = repo.export_changes(str(tmp_path / 'c.jsonl'), since=1)
+    assert summary['full'] and summary['written'] == 5
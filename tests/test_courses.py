@@ -0,0 +1,61 @@
+"""Enrollments, bulk grade posting and GPA"""
+
+import pytest
+
+from conftest import add_students
+
+@pytest.fixture
+def course(repo):
+    """CS101 (4 credits) with students 1-4 enrolled and student 4 dropped"""
+    add_students(repo, 5)
+    course_id = repo.courses.add_course('CS101', 'Programming', credits=4)
+    for student_id in (1, 2, 3, 4):
+        repo.courses.enroll_student(student_id, course_id)
+    repo.courses.drop_enrollment(4, course_id)
+    return course_id
+
+def write_grades(path, rows):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("Student ID,Email,Grade\n")
+        f.writelines(f"{student_id},{email},{grade}\n" for student_id, email, grade in rows)
+    return str(path)
+
+def grades(repo, course_id):
+    return dict(repo.conn.execute(
+        "SELECT student_id, grade FROM enrollments WHERE course_id = ? AND grade IS NOT NULL",
+        (course_id,)).fetchall())
+
+def test_unknown_grades_are_not_posted(repo, course, tmp_path):
+    filename = write_grades(tmp_path / 'grades.csv', [
+        (1, '', 'a'), (2, '', 'Z'), (3, '', 'excellent'), (2, '', 'B+')])
+
+    assert repo.courses.bulk_post_grades(course, filename) == (2, 0, 2)
+    assert grades(repo, course) == {1: 'A', 2: 'B+'}
+    status = repo.conn.execute(
+        "SELECT status FROM enrollments WHERE course_id = ? AND student_id = 3", (course,))
+    assert status.fetchone()[0] == 'Enrolled'
+
+def test_last_valid_row_wins_and_unmatched_rows_are_counted(repo, course, tmp_path):
+    email = repo.get_student(3)['email']
+    filename = write_grades(tmp_path / 'grades.csv', [
+        (1, '', 'C'), (1, '', 'A-'), (1, '', 'Q'), ('', email, 'B'),
+        (4, '', 'A'), (5, '', 'A'), ('x1', '', 'A'), ('', 'nobody@example.edu', 'A')])
+
+    # 4 is dropped, 5 is not enrolled, x1 is no id and nobody has no student
+    assert repo.courses.bulk_post_grades(course, filename) == (2, 4, 1)
+    assert grades(repo, course) == {1: 'A-', 3: 'B'}
+
+def test_gpa_weighs_graded_credits(repo, course, tmp_path):
+    other = repo.courses.add_course('MA101', 'Calculus', credits=2)
+    repo.courses.enroll_student(1, other)
+    repo.courses.bulk_post_grades(course, write_grades(tmp_path / 'g.csv', [(1, '', 'B')]))
+
+    # MA101 is attempted but ungraded, so only CS101 counts towards the GPA
+    assert repo.courses.student_gpa(1) == (3.0, 6, 4)
+    assert repo.courses.student_gpa(5) == (None, 0, 0)
+
+def test_enroll_checks_ids(repo, course):
+    assert repo.courses.enroll_student(5, course) is True
+    assert repo.courses.enroll_student(5, course) is False
+    with pytest.raises(ValueError, match="No student"):
+        repo.courses.enroll_student(99, course)
@@ -0,0 +1,85 @@
+"""Duplicate scoring, match_keys upkeep and import matching"""
+
+import itertools
+
+from student_management import duplicates
+from student_management.duplicates import prepare, score_pair
+
+from conftest import add_students
+
+RECORDS = [prepare(*fields) for fields in [
+    ('Maria', 'Garcia', 'mgarcia@example.edu', '555-123-4567', '2001-04-02'),
+    ('Garcia', 'Maria', 'maria.garcia@mail.com', '', '2001-04-02'),
+    ('Marie', 'Garcia', 'mgarcia@example.edu', '', ''),
+    ('Maria', 'Garcia', 'other@example.edu', '555-999-0000', '1999-12-31'),
+    ('Mario', 'Garza', 'mgarza@example.edu', '(555) 123-4567', '2001-04-02'),
+    ('John', 'Smith', '', '', ''),
+]]
+
+def keys_of(repo, student_id):
+    return {row[0] for row in repo.conn.execute(
+        "SELECT key FROM match_keys WHERE student_id = ?", (student_id,))}
+
+def test_score_pair_weights():
+    same = RECORDS[0]
+    assert score_pair(same, same) == 1.0
+    # Swapped names match fully; the missing phone counts as half
+    assert score_pair(RECORDS[0], RECORDS[1]) == round(0.2 + 0.1 + 0.5 + 0.1 * duplicates.similarity(
+        RECORDS[0][2], RECORDS[1][2]), 3)
+    # Same name, but date of birth and phone disagree
+    assert score_pair(RECORDS[0], RECORDS[3]) < duplicates.DUPLICATE_THRESHOLD
+
+def test_threshold_only_skips_pairs_that_cannot_reach_it():
+    for a, b in itertools.combinations(RECORDS, 2):
+        full = score_pair(a, b)
+        for threshold in (0.5, 0.7, 0.8, 0.9):
+            pruned = score_pair(a, b, threshold)
+            if full >= threshold:
+                assert pruned == full
+            else:
+                assert pruned < threshold
+    # Different date of birth and phone: even equal names cannot reach 0.8
+    assert score_pair(RECORDS[0], RECORDS[3], 0.8) == 0.0
+    # Date of birth and phone both missing: 0.8 needs exactly equal names
+    assert score_pair(RECORDS[2], RECORDS[5], 0.8) == 0.0
+
+def test_refresh_keys_updates_changed_students_only(repo):
+    ids = add_students(repo, 5)
+    assert repo.writer.run(duplicates.refresh_keys) == 5
+    assert repo.writer.run(duplicates.refresh_keys) == 0
+
+    student = repo.get_student(ids[2])
+    old_keys = keys_of(repo, ids[2])
+    repo.update_student(ids[2], 'Zed', student['last_name'], student['email'])
+
+    assert repo.writer.run(duplicates.refresh_keys) == 1
+    new_keys = keys_of(repo, ids[2])
+    assert new_keys != old_keys and 'n:' + '\x1f'.join(sorted(('zed', 'lee'))) in new_keys
+
+def test_refresh_keys_rebuilds_after_large_changes(repo, monkeypatch):
+    ids = add_students(repo, 5)
+    repo.writer.run(duplicates.refresh_keys)
+    # Two changed students out of a minimum of 1000 is over the fraction
+    monkeypatch.setattr(duplicates, 'KEYS_REBUILD_FRACTION', 0.001)
+    for student_id in ids[:2]:
+        student = repo.get_student(student_id)
+        repo.update_student(student_id, 'Zed', student['last_name'], student['email'])
+    repo.delete_student(ids[4])
+
+    assert repo.writer.run(duplicates.refresh_keys) == 4
+    assert keys_of(repo, ids[4]) == set()
+
+def test_match_rows_skips_the_row_own_email(repo):
+    student_id = repo.add_student('Maria', 'Garcia', 'mgarcia@example.edu', '555-123-4567',
+                                  '2001-04-02')
+    repo.writer.run(duplicates.refresh_keys)
+    rows = [
+        ('Maria', 'Garcia', 'MGarcia@example.edu', '555-123-4567', '2001-04-02', '', 'Active'),
+        ('Maria', 'Garcia', 'maria.g@mail.com', '5551234567', '2001-04-02', '', 'Active'),
+        ('John', 'Smith', 'jsmith@example.edu', '', '', '', 'Active'),
+    ]
+
+    matches = repo.writer.run(duplicates.match_rows, rows)
+
+    assert [(index, student) for index, _, student in matches] == [(1, student_id)]
+    assert matches[0][1] >= duplicates.DUPLICATE_THRESHOLD
@@ -0,0 +1,115 @@
+"""Campus federation: merged paging, ranked search, reports and routed writes"""
+
+import os
+import sqlite3
+
+import pytest
+
+from student_management import CampusFederation, StudentRepository, cli
+from student_management.federation import parse_campuses
+
+from conftest import add_students
+
+@pytest.fixture
+def campus_paths(tmp_path):
+    """Two campus databases whose rosters share names"""
+    paths = {}
+    for campus, count in (('north', 23), ('south', 17)):
+        paths[campus] = str(tmp_path / f'{campus}.db')
+        repo = StudentRepository(paths[campus])
+        add_students(repo, count, domain=f'{campus}.edu')
+        repo.close()
+    return paths
+
+@pytest.fixture
+def federation(campus_paths):
+    federation = CampusFederation(campus_paths, read_only=True)
+    yield federation
+    federation.close()
+
+def all_rows(campus_paths):
+    """Every list row of every campus, sorted the way the federation merges"""
+    rows = []
+    for campus, path in campus_paths.items():
+        repo = StudentRepository(path, read_only=True)
+        rows += [(campus,) + row for row in repo.fetch_student_page(10 ** 6)]
+        repo.close()
+    return sorted(rows, key=CampusFederation.list_key)
+
+def test_pages_cover_every_campus_in_name_order(federation, campus_paths):
+    expected = all_rows(campus_paths)
+    rows = federation.fetch_student_page(7)
+    page = rows
+    while page:
+        page = federation.fetch_student_page(7, after=federation.list_key(rows[-1]))
+        rows += page
+
+    assert rows == expected
+    assert federation.count_students() == 40
+    assert federation.campus_counts() == {'north': 23, 'south': 17}
+
+def test_page_after_a_name_shared_across_campuses(federation, campus_paths):
+    expected = [row for row in all_rows(campus_paths) if row[2:4] == ('Ann', 'Lee')]
+    assert {row[0] for row in expected} == {'north', 'south'}
+
+    page = federation.fetch_student_page(len(expected) - 1, search_term='ann lee',
+                                         after=federation.list_key(expected[0]))
+    assert page == expected[1:]
+
+def test_search_merges_campuses_by_relevance(federation, campus_paths):
+    scored = []
+    for campus, repo in federation.campuses.items():
+        for row in repo.search_table('students', 'moss', 100, scored=True):
+            scored.append((row[-1], campus) + row[:-1])
+    scored.sort(key=lambda row: (row[0], row[4], row[3], row[1], row[2]))
+
+    rows = federation.search_students('moss', limit=5)
+    assert rows == [row[1:] for row in scored[:5]]
+    assert all(row[3] == 'Moss' for row in rows)
+
+def test_report_lists_every_student_with_their_campus(federation, campus_paths, tmp_path):
+    filename = str(tmp_path / 'report.txt')
+    summary = federation.write_report(filename)
+    with open(filename, encoding='utf-8') as f:
+        lines = f.read().split("STUDENT LIST:\n" + "-" * 20 + "\n")[1].splitlines()
+
+    assert summary['total'] == 40
+    assert lines == [f"{row[3]}, {row[2]} - {row[4]} ({row[6]}) [{row[0]}]"
+                     for row in sorted(all_rows(campus_paths), key=lambda row: (row[3], row[2]))]
+
+def test_writes_go_to_the_owning_campus(campus_paths):
+    federation = CampusFederation(campus_paths)
+    try:
+        key = federation.add_student('south', 'Ivy', 'Nash', 'ivy@south.edu')
+        assert key == ('south', 18)
+        federation.update_student(key, 'Ivy', 'Nash-Ode', 'ivy@south.edu')
+        assert federation.get_student(key)['last_name'] == 'Nash-Ode'
+        assert federation.get_student(key)['campus'] == 'south'
+        assert federation.campus_counts() == {'north': 23, 'south': 18}
+        with pytest.raises(ValueError, match="Unknown campus"):
+            federation.delete_student(('west', 1))
+    finally:
+        federation.close()
+
+def test_missing_campus_database_is_an_error(campus_paths, tmp_path):
+    missing = str(tmp_path / 'nowhere.db')
+    with pytest.raises(FileNotFoundError):
+        CampusFederation({**campus_paths, 'west': missing}, read_only=True)
+    with pytest.raises(SystemExit):
+        cli.main(['--campus', f'north={campus_paths["north"]}', '--campus', f'west={missing}',
+                  'search', 'lee'])
+    assert not os.path.exists(missing)
+
+def test_parse_campuses():
+    assert parse_campuses(['a=one.db', 'data/two.db']) == {'a': 'one.db', 'two': 'data/two.db'}
+    with pytest.raises(ValueError, match="twice"):
+        parse_campuses(['a=one.db', 'a=two.db'])
+
+def test_campus_database_behind_the_schema_is_an_error(campus_paths, tmp_path):
+    old = str(tmp_path / 'old.db')
+    sqlite3.connect(old).close()
+    with pytest.raises(sqlite3.DatabaseError, match="schema version 0"):
+        CampusFederation({**campus_paths, 'old': old}, read_only=True)
+    with pytest.raises(SystemExit):
+        cli.main(['--campus', f'old={old}', 'report', str(tmp_path / 'report.txt')])
+    assert sqlite3.connect(old).execute("PRAGMA user_version").fetchone()[0] == 0
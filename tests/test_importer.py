@@ -0,0 +1,122 @@
+"""CSV import: shard boundaries, rejected line numbers and cancellation"""
+
+import csv
+import functools
+import os
+import threading
+
+import pytest
+
+from student_management import importer
+
+HEADER = 'First Name,Last Name,Email,Phone,Date of Birth,Address,Status\n'
+
+def write_csv(path, records):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        f.write(HEADER)
+        f.writelines(records)
+    return str(path)
+
+def sample_records(count):
+    """Valid records, every seventh one with a bad email and every fifth
+    one with an address that spans two lines"""
+    records = []
+    for i in range(count):
+        email = f"student{i}@example.edu" if i % 7 else f"student{i}-at-example.edu"
+        address = f'"{i} Main St\nApt {i}"' if i % 5 == 0 else f"{i} Main St"
+        records.append(f"First{i},Last{i},{email},555-{i:04},2000-01-01,{address},active\n")
+    return records
+
+def expected_rejects(records):
+    """Line numbers of the records with a bad email, counting the header as line 1"""
+    lines = []
+    line = 2
+    for record in records:
+        if '-at-' in record:
+            lines.append(line)
+        line += record.count('\n')
+    return lines
+
+def read_rejected(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return [int(row[0]) for row in list(csv.reader(f))[1:]]
+
+@pytest.fixture
+def small_shards(monkeypatch):
+    """Cut every file into shards of about 300 bytes"""
+    monkeypatch.setattr(importer, 'PARALLEL_MIN_BYTES', 0)
+    monkeypatch.setattr(importer, 'SHARD_BYTES', 300)
+    monkeypatch.setattr(importer, 'shard_ranges',
+                        functools.partial(importer.shard_ranges, shard_bytes=300))
+
+def test_shards_end_on_record_boundaries(tmp_path):
+    records = sample_records(60)
+    filename = write_csv(tmp_path / 'in.csv', records)
+    fieldnames, data_start = importer.read_header(filename)
+    ranges = list(importer.shard_ranges(filename, data_start, shard_bytes=200))
+
+    assert len(ranges) > 5
+    assert ranges[0][0] == data_start and ranges[-1][1] == os.path.getsize(filename)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    rows = [row for start, end in ranges
+            for row in importer.parse_shard(filename, start, end, fieldnames)[0]]
+    assert [row[2] for row in rows] == [f"student{i}@example.edu" for i in range(60) if i % 7]
+    assert rows[4][5] == "5 Main St\nApt 5"
+
+def test_stray_quote_leaves_the_tail_in_one_shard(tmp_path):
+    records = sample_records(20) + ['Bad,"Quote,bad@example.edu\n'] + sample_records(20)
+    filename = write_csv(tmp_path / 'in.csv', records)
+    _, data_start = importer.read_header(filename)
+    ranges = list(importer.shard_ranges(filename, data_start, shard_bytes=200))
+    assert ranges[-1][1] == os.path.getsize(filename)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+
+def test_parse_shard_reports_the_first_line_of_a_record(tmp_path):
+    records = sample_records(15)
+    filename = write_csv(tmp_path / 'in.csv', records)
+    fieldnames, data_start = importer.read_header(filename)
+    rows, rejected, lines = importer.parse_shard(filename, data_start,
+                                                 os.path.getsize(filename), fieldnames)
+
+    assert len(rows) + len(rejected) == 15
+    # Shard-relative lines; the importer adds the header line
+    assert [entry[0] + 1 for entry in rejected] == expected_rejects(records)
+    assert lines == sum(record.count('\n') for record in records)
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_import_across_shards(repo, tmp_path, small_shards, workers):
+    records = sample_records(80)
+    filename = write_csv(tmp_path / 'in.csv', records)
+    summary = repo.import_students(filename, workers=workers)
+
+    rejects = expected_rejects(records)
+    assert summary['imported'] == 80 - len(rejects)
+    assert summary['rejected'] == len(rejects)
+    assert read_rejected(summary['rejected_file']) == rejects
+    assert repo.count_students() == 80 - len(rejects)
+    assert repo.get_student(5)['address'] == "5 Main St\nApt 5"
+
+def test_existing_emails_are_skipped_or_updated(repo, tmp_path):
+    repo.add_student('Old', 'Name', 'student1@example.edu')
+    filename = write_csv(tmp_path / 'in.csv', sample_records(3))
+
+    summary = repo.import_students(filename)
+    assert (summary['imported'], summary['skipped']) == (1, 1)
+    assert repo.get_student(1)['first_name'] == 'Old'
+
+    summary = repo.import_students(filename, upsert=True)
+    assert summary['imported'] == 2
+    assert repo.get_student(1)['first_name'] == 'First1'
+
+def test_cancelled_import_keeps_nothing(repo, tmp_path, small_shards):
+    records = sample_records(80)
+    filename = write_csv(tmp_path / 'in.csv', records)
+    cancelled = threading.Event()
+
+    summary = repo.import_students(filename, workers=1, cancelled=cancelled,
+                                   report=lambda fraction, message: cancelled.set())
+
+    assert summary['cancelled']
+    assert summary['rejected_file'] is None
+    assert not os.path.exists(tmp_path / 'in_rejected.csv')
+    assert repo.count_students() == 0
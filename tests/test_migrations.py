@@ -0,0 +1,101 @@
+"""Schema migrations tracked with PRAGMA user_version"""
+
+import os
+import sqlite3
+
+import pytest
+
+from student_management import StudentRepository, schema
+
+def objects(conn):
+    """Names of every table, index and trigger in the database"""
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+
+def migrate_to(db_path, version, monkeypatch):
+    """Create a database that stops at an older schema version"""
+    with monkeypatch.context() as patch:
+        patch.setattr(schema, 'MIGRATIONS', schema.MIGRATIONS[:version])
+        conn = sqlite3.connect(db_path)
+        schema.migrate(conn)
+    return conn
+
+def test_new_database_is_current(repo):
+    names = objects(repo.conn)
+    assert schema.schema_version(repo.conn) == schema.SCHEMA_VERSION
+    assert {'students', 'courses', 'enrollments', 'change_log', 'log_positions',
+            'idx_students_name', 'students_fts'} <= names
+    assert not {'table_versions', 'sqlite_stat1'} & names
+    assert not any(name.endswith(('_version_insert', '_version_update', '_version_delete'))
+                   for name in names)
+
+def test_migrate_is_a_no_op_when_current(repo, db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        before = objects(conn)
+        assert schema.migrate(conn) == schema.SCHEMA_VERSION
+        assert objects(conn) == before
+    finally:
+        conn.close()
+
+def test_upgrade_keeps_data(db_path, monkeypatch):
+    conn = migrate_to(db_path, 5, monkeypatch)
+    conn.execute("""
+        INSERT INTO students (first_name, last_name, email) VALUES ('Ann', 'Lee', 'ann@example.edu')
+    """)
+    conn.commit()
+    assert 'change_log' not in objects(conn)
+    conn.close()
+
+    repo = StudentRepository(db_path)
+    try:
+        assert schema.schema_version(repo.conn) == schema.SCHEMA_VERSION
+        assert {'change_log', 'archived_students', 'match_keys', 'log_positions'} <= objects(repo.conn)
+        assert [row[2] for row in repo.search_students('lee')] == ['Lee']
+        # Rows from before the log get a change_log entry once they change
+        repo.update_student(1, 'Ann', 'Leigh', 'ann@example.edu')
+        assert repo.conn.execute("SELECT row_id, operation FROM change_log").fetchall() == [
+            (1, 'UPDATE')]
+    finally:
+        repo.close()
+
+def test_failed_migration_is_rolled_back(db_path, monkeypatch):
+    conn = migrate_to(db_path, 8, monkeypatch)
+
+    def broken(cursor):
+        cursor.execute("CREATE TABLE half_done (x)")
+        raise sqlite3.OperationalError("boom")
+
+    monkeypatch.setattr(schema, 'MIGRATIONS', schema.MIGRATIONS[:8] + [broken])
+    with pytest.raises(sqlite3.OperationalError):
+        schema.migrate(conn)
+    assert schema.schema_version(conn) == 8
+    assert 'half_done' not in objects(conn)
+    conn.close()
+
+def test_newer_database_is_refused(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"PRAGMA user_version = {schema.SCHEMA_VERSION + 1}")
+    with pytest.raises(sqlite3.DatabaseError, match="newer"):
+        schema.migrate(conn)
+    conn.close()
+
+def test_read_only_repository_does_not_migrate(db_path, monkeypatch):
+    migrate_to(db_path, 8, monkeypatch).close()
+    with pytest.raises(sqlite3.DatabaseError, match="schema version 8"):
+        StudentRepository(db_path, read_only=True)
+    conn = sqlite3.connect(db_path)
+    assert schema.schema_version(conn) == 8
+    conn.close()
+
+    StudentRepository(db_path).close()
+    repo = StudentRepository(db_path, read_only=True)
+    try:
+        assert schema.schema_version(repo.conn) == schema.SCHEMA_VERSION
+        assert repo.writer is None
+    finally:
+        repo.close()
+
+def test_read_only_repository_needs_the_file(db_path):
+    with pytest.raises(FileNotFoundError):
+        StudentRepository(db_path, read_only=True)
+    assert not os.path.exists(db_path)
@@ -0,0 +1,68 @@
+"""Keyset paging of the student list"""
+
+from conftest import add_students
+
+def name_order(repo, filter_sql="", params=()):
+    """Every list row in list order, fetched in one query"""
+    return repo.fetch_student_page(10 ** 6, filter_sql, params)
+
+def test_pages_forward_cover_every_row_once(repo):
+    add_students(repo, 47)
+    expected = name_order(repo)
+
+    pages = [repo.fetch_student_page(10)]
+    while pages[-1]:
+        pages.append(repo.fetch_student_page(10, after=repo.list_key(pages[-1][-1])))
+
+    assert [row for page in pages for row in page] == expected
+    assert [len(page) for page in pages] == [10, 10, 10, 10, 7, 0]
+
+def test_pages_backward_match_forward(repo):
+    add_students(repo, 35)
+    expected = name_order(repo)
+
+    rows = expected[-5:]
+    while True:
+        page = repo.fetch_student_page(5, before=repo.list_key(rows[0]))
+        if not page:
+            break
+        rows = page + rows
+
+    assert rows == expected
+
+def test_page_after_a_tied_name_continues_on_student_id(repo):
+    ids = add_students(repo, 10)
+    lees = [row for row in name_order(repo) if row[2] == 'Lee' and row[1] == 'Ann']
+    assert [row[0] for row in lees] == [ids[0], ids[2], ids[6]]
+
+    page = repo.fetch_student_page(2, after=repo.list_key(lees[0]))
+    assert [row[0] for row in page] == [ids[2], ids[6]]
+
+def test_offset_jump_matches_keyset_page(repo):
+    add_students(repo, 30)
+    expected = name_order(repo)
+
+    assert repo.fetch_student_page(6, offset=12) == expected[12:18]
+    assert repo.fetch_student_page(6, after=repo.list_key(expected[11])) == expected[12:18]
+
+def test_paging_a_search_filter(repo):
+    add_students(repo, 40)
+    filter_sql, params = repo.build_search_filter('moss')
+    expected = name_order(repo, filter_sql, params)
+    assert expected and all(row[2] == 'Moss' for row in expected)
+    assert repo.count_students(filter_sql, params) == len(expected)
+
+    first = repo.fetch_student_page(3, filter_sql, params)
+    rest = repo.fetch_student_page(100, filter_sql, params, after=repo.list_key(first[-1]))
+    assert first + rest == expected
+
+def test_short_search_words_match_inside_names(repo):
+    add_students(repo, 10)
+    filter_sql, params = repo.build_search_filter('os')
+    assert {row[2] for row in name_order(repo, filter_sql, params)} == {'Moss'}
+
+def test_pooled_connection_pages_match(repo):
+    add_students(repo, 20)
+    with repo.readers.connection() as conn:
+        assert repo.fetch_student_page(20, conn=conn) == name_order(repo)
+        assert repo.count_students(conn=conn) == 20
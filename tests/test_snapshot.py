@@ -0,0 +1,126 @@
+"""Columnar roster snapshot: refresh from change_log, sorting and search"""
+
+import pytest
+
+from student_management import snapshot as snapshot_module
+from student_management.snapshot import StudentSnapshot
+
+from conftest import add_students
+
+def rows(snapshot, positions):
+    return [snapshot.row(i) for i in positions]
+
+def ids(rows):
+    return [row[0] for row in rows]
+
+def check_positions(snapshot):
+    """Every id maps to the slot that holds it"""
+    assert len(snapshot.position) == len(snapshot)
+    for student_id, i in snapshot.position.items():
+        assert snapshot.ids[i] == student_id
+
+def test_default_view_matches_the_list(repo):
+    add_students(repo, 25)
+    snapshot = repo.student_snapshot()
+    assert ids(rows(snapshot, snapshot.view())) == ids(repo.fetch_student_page(100))
+
+def test_sort_ties_follow_the_default_order(repo):
+    for first, last, status in (('Zed', 'Young', 'Active'), ('Amy', 'Adams', 'Active'),
+                                ('Bo', 'Baker', 'Active'), ('Al', 'Adams', 'Graduated')):
+        repo.add_student(first, last, f"{first}@example.edu", status=status)
+    repo.student_snapshot()
+    # Added after the load, so it sits in the last slot
+    repo.add_student('Ann', 'Aardvark', 'ann@example.edu', status='Active')
+    snapshot = repo.student_snapshot()
+
+    view = snapshot.view([('status', False)])
+    assert [row[2] for row in rows(snapshot, view)] == ['Aardvark', 'Adams', 'Baker', 'Young', 'Adams']
+    view = snapshot.view([('status', True)])
+    assert [row[1] for row in rows(snapshot, view)][:2] == ['Al', 'Ann']
+
+def test_refresh_applies_only_the_changes(repo):
+    add_students(repo, 10)
+    snapshot = repo.student_snapshot()
+    seq = snapshot.seq
+    assert not snapshot.refresh(repo.conn)
+
+    repo.update_student(3, 'Cat', 'Zhou', 'cat@example.edu')
+    repo.delete_student(5)
+    new_id = repo.add_student('New', 'Kid', 'new@example.edu')
+    loads = []
+    snapshot.load = loads.append
+    assert snapshot.refresh(repo.conn)
+
+    assert loads == []
+    assert snapshot.seq > seq
+    assert 5 not in snapshot.position
+    assert snapshot.row(snapshot.position[3])[1:3] == ('Cat', 'Zhou')
+    assert snapshot.row(snapshot.position[new_id])[1] == 'New'
+    check_positions(snapshot)
+    assert ids(rows(snapshot, snapshot.view())) == ids(repo.fetch_student_page(100))
+
+def test_refresh_reloads_when_the_log_was_pruned(repo, tmp_path):
+    add_students(repo, 10)
+    snapshot = repo.student_snapshot()
+    repo.update_student(1, 'Al', 'Lee', 'al@example.edu')
+    repo.update_student(2, 'Bo', 'Lee', 'bo@example.edu')
+    repo.export_changes(str(tmp_path / 'feed.jsonl'), feed='nightly')
+    repo.prune_change_log()
+
+    assert snapshot.refresh(repo.conn)
+    assert ids(rows(snapshot, snapshot.view())) == ids(repo.fetch_student_page(100))
+
+def test_refresh_reloads_after_many_changes(repo, monkeypatch):
+    add_students(repo, 10)
+    snapshot = repo.student_snapshot()
+    monkeypatch.setattr(snapshot_module, 'FULL_RELOAD_FRACTION', 0.001)
+    repo.update_student(1, 'Al', 'Lee', 'al@example.edu')
+    repo.update_student(2, 'Bo', 'Lee', 'bo@example.edu')
+
+    loads = []
+    load = snapshot.load
+    snapshot.load = lambda conn: loads.append(load(conn))
+    assert snapshot.refresh(repo.conn)
+    assert len(loads) == 1
+    assert ids(rows(snapshot, snapshot.view())) == ids(repo.fetch_student_page(100))
+
+@pytest.mark.parametrize('student_id', [1, 4, 6])
+def test_remove_moves_the_last_row_into_the_slot(student_id):
+    snapshot = StudentSnapshot()
+    for i in range(1, 7):
+        snapshot.put((i, f'F{i}', f'L{i}', f'e{i}@example.edu', None, 'Active'))
+    snapshot.view([('student_id', False)])
+
+    snapshot.remove(student_id)
+    snapshot.remove(99)
+
+    check_positions(snapshot)
+    assert snapshot.orders == {}
+    assert [row[0] for row in rows(snapshot, snapshot.view([('student_id', False)]))] == [
+        i for i in range(1, 7) if i != student_id]
+
+def test_search_matches_like_the_database(repo):
+    add_students(repo, 30)
+    repo.add_student('Rosa', 'Park', 'rp@example.edu', phone='555-0142')
+    snapshot = repo.student_snapshot()
+
+    for term in ('os', 'MOSS', 'ann lee', '0142', 'lee.3', 'zz'):
+        filter_sql, params = repo.build_search_filter(term)
+        expected = repo.fetch_student_page(100, filter_sql, params)
+        assert ids(rows(snapshot, snapshot.view(search=term))) == ids(expected), term
+
+def test_search_words_do_not_span_columns():
+    snapshot = StudentSnapshot()
+    snapshot.put((1, 'Ann', 'Lee', 'a@example.edu', None, 'Active'))
+    assert snapshot.view(search='annlee') == []
+    assert snapshot.view(search='nn le') == [0]
+
+def test_status_filter_and_search_follow_changes():
+    snapshot = StudentSnapshot()
+    snapshot.put((1, 'Ann', 'Lee', 'a@example.edu', None, 'Active'))
+    snapshot.put((2, 'Bob', 'Moss', 'b@example.edu', None, 'Graduated'))
+    assert snapshot.view(statuses=['Graduated'], search='mos') == [1]
+
+    snapshot.put((2, 'Bob', 'Ross', 'b@example.edu', None, 'Graduated'))
+    assert snapshot.view(statuses=['Graduated'], search='mos') == []
+    assert snapshot.view(statuses=['Active', 'Graduated'], search='ross') == [1]